@@ -0,0 +1,324 @@
+import random
+import numpy as np
+
+from gameplay import GameState, Move, Snapshot
+
+"""
+    NumPy-backed board with the same public API as gameplay.Board.
+    Mines, clicked squares, flags and neighbor counts live in compact arrays
+    instead of a grid of Square objects.
+"""
+
+
+class ArrayBoard:
+    """
+        Creates a playable board that can be clicked, stored as NumPy arrays.
+        seed works as for gameplay.Board, and the same seed gives the same mine layout on both.
+        Moves are recorded on undo_stack as on gameplay.Board, and snapshots hold the mine,
+        clicked and flagged arrays packed eight squares to a byte with np.packbits.
+    """
+
+    def __init__(self, rows, cols, number_of_mines=10, seed=None):
+        self.rows = rows
+        self.cols = cols
+        self.game_state = GameState.START
+        self.number_of_mines = number_of_mines
+        self.seed = seed
+        self.random = seed if isinstance(seed, random.Random) else random.Random(seed)
+        self.mines = np.zeros((rows, cols), dtype=bool)
+        self.clicked = np.zeros((rows, cols), dtype=bool)
+        self.flagged = np.zeros((rows, cols), dtype=bool)
+        self.counts = np.zeros((rows, cols), dtype=np.uint8)
+        self.safe_remaining = rows * cols
+        self.mine_count = 0
+        self.flag_count = 0
+        self.flagged_mines = 0
+        self.undo_stack = []
+        self.set_random_mines(self.rows, self.cols, self.number_of_mines)
+
+    def click(self, row, col):
+        """
+            Clicks the square and, if the square does not contain a mine, also clicks its neighbors that do not contain mines.
+            If the first square you click is a mine, instead remove that mine from the game.
+            Returns the coordinates of every square newly revealed by this click.
+        """
+        if not self.is_valid_square(row, col):
+            raise IndexError('Not on the board.')
+        if self.clicked[row, col] or self.game_state in [GameState.WIN, GameState.LOSE]:
+            return []
+
+        previous_state = self.game_state
+        removed_mine = None
+        if self.game_state == GameState.START:
+            if self.mines[row, col]:
+                self.remove_mine(row, col)
+                removed_mine = (row, col)
+            self.game_state = GameState.ONGOING
+        self.clicked[row, col] = True
+        revealed = [(row, col)]
+        self.undo_stack.append(Move(revealed, None, removed_mine, previous_state))
+
+        if self.mines[row, col]:
+            self.game_state = GameState.LOSE
+            return revealed
+        self.safe_remaining -= 1
+        if self.counts[row, col] == 0:
+            self.reveal_zeros(row, col, revealed)
+        if self.winner():
+            self.game_state = GameState.WIN
+        return revealed
+
+    def reveal_zeros(self, row, col, revealed):
+        """
+            Opens the region of zero squares around (row, col), plus its numbered border.
+            Newly revealed coordinates are appended to revealed.
+            Only zero squares are expanded, so none of their neighbors is a mine. The fill walks flat
+            memoryviews of the arrays by index offset, as indexing NumPy one element at a time is slow.
+        """
+        rows, cols = self.rows, self.cols
+        clicked = memoryview(self.clicked.reshape(-1))
+        counts = memoryview(self.counts.reshape(-1))
+        offsets = (-cols - 1, -cols, -cols + 1, -1, 1, cols - 1, cols, cols + 1)
+        opened = []
+        stack = [row * cols + col]
+        while stack:
+            index = stack.pop()
+            r, c = divmod(index, cols)
+            if 0 < r < rows - 1 and 0 < c < cols - 1:
+                around = offsets
+            else:
+                around = [nr * cols + nc - index for nr in range(max(r - 1, 0), min(r + 2, rows))
+                          for nc in range(max(c - 1, 0), min(c + 2, cols))]
+            for j in around:
+                j += index
+                if clicked[j]:
+                    continue
+                clicked[j] = True
+                opened.append(j)
+                if counts[j] == 0:
+                    stack.append(j)
+        self.safe_remaining -= len(opened)
+        revealed.extend(divmod(j, cols) for j in opened)
+
+    def print_board(self, print_square):
+        """
+        Prints the border of the board, showing the numbers associated with row and column.
+        """
+        print("\n")
+        col_print = "    "
+        for i in range(0, self.cols):
+            col_print += str(i) + "  "
+        print(col_print + "\n")
+        for i in range(self.rows):
+            row_print = str(i) + "  "
+            for j in range(self.cols):
+                row_print += print_square(self.get_square(i, j))
+            print(row_print + "\n")
+
+    def print_square(self, square):
+        """
+            If the square does not neighbor mines, return a dot.
+            If it does, return the number of mines it neighbors.
+            If the square is flagged, return f.
+            Else, return an unclicked square X.
+        """
+        if square.clicked:
+            if square.mine_neighbors() == 0:
+                return " . "
+            return " " + str(square.mine_neighbors()) + " "
+        elif square.flagged:
+            return " f "
+        return " X "
+
+    def print_solution(self, square):
+        if square.mine:
+            return " M "
+        return self.print_square(square)
+
+    def get_dimensions(self):
+        return self.rows, self.cols
+
+    def winner(self):
+        """
+        Establishes the win condition, where all the remaining unclicked squares
+        on the board must be mines, or every mine (and nothing else) has been flagged.
+        """
+        return self.safe_remaining == 0 or self.flag_count == self.flagged_mines == self.mine_count
+
+    def toggle_flag(self, row, col):
+        """
+            Flags or unflags the square, winning the game once exactly the mines are flagged.
+        """
+        self.undo_stack.append(Move([], (row, col), None, self.game_state))
+        flagged = not self.flagged[row, col]
+        self.flagged[row, col] = flagged
+        step = 1 if flagged else -1
+        self.flag_count += step
+        if self.mines[row, col]:
+            self.flagged_mines += step
+        if self.game_state == GameState.ONGOING and self.winner():
+            self.game_state = GameState.WIN
+
+    def undo(self):
+        """
+            Takes back the last click or flag, returning the Move that was undone.
+        """
+        if not self.undo_stack:
+            raise IndexError('Nothing to undo.')
+        move = self.undo_stack.pop()
+        if move.flag:
+            row, col = move.flag
+            self.flagged[row, col] = not self.flagged[row, col]
+            step = 1 if self.flagged[row, col] else -1
+            self.flag_count += step
+            if self.mines[row, col]:
+                self.flagged_mines += step
+        for row, col in move.revealed:
+            self.clicked[row, col] = False
+            if not self.mines[row, col]:
+                self.safe_remaining += 1
+        if move.removed_mine:
+            self.mines[move.removed_mine] = True
+            self.update_counts()
+        self.game_state = move.game_state
+        return move
+
+    def snapshot(self):
+        """
+            Returns a Snapshot of the mines, clicked and flagged arrays packed into bits.
+        """
+        return Snapshot(np.packbits(self.mines), np.packbits(self.clicked), np.packbits(self.flagged),
+                        self.game_state, len(self.undo_stack))
+
+    def restore(self, snapshot):
+        """
+            Puts the board back to a Snapshot taken from it, trimming the undo stack as gameplay.Board does.
+        """
+        cells = self.rows * self.cols
+        self.mines = np.unpackbits(snapshot.mines, count=cells).astype(bool).reshape(self.rows, self.cols)
+        self.clicked = np.unpackbits(snapshot.clicked, count=cells).astype(bool).reshape(self.rows, self.cols)
+        self.flagged = np.unpackbits(snapshot.flagged, count=cells).astype(bool).reshape(self.rows, self.cols)
+        self.update_counts()
+        self.flag_count = int(np.count_nonzero(self.flagged))
+        self.game_state = snapshot.game_state
+        if len(self.undo_stack) >= snapshot.depth:
+            del self.undo_stack[snapshot.depth:]
+        else:
+            self.undo_stack.clear()
+
+    def get_square(self, row, col):
+        """ Return a view of the square at the given row and column."""
+        return ArraySquare(self, row, col)
+
+    def is_unknown(self, square):
+        return not square.clicked and not square.flagged
+
+    def get_neighbor_coords(self, row, col):
+        """ Return the coordinates of the squares around (row, col) that are on the board."""
+        return [(r, c)
+                for r in range(max(row - 1, 0), min(row + 2, self.rows))
+                for c in range(max(col - 1, 0), min(col + 2, self.cols))
+                if r != row or c != col]
+
+    def get_neighboring_squares(self, square):
+        r, c = square.get_coords()
+        return [self.get_square(nr, nc) for nr, nc in self.get_neighbor_coords(r, c)]
+
+    def is_valid_square(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols
+
+    def set_random_mines(self, rows, cols, number_of_mines):
+        cells = self.random.sample(range(rows * cols), number_of_mines)
+        self.mines.flat[cells] = True
+        self.update_counts()
+
+    def set_mines(self, coords):
+        """
+        Used for testing purposes.
+        """
+        for sq_row, sq_col in coords:
+            self.mines[sq_row, sq_col] = True
+        self.update_counts()
+
+    def update_counts(self):
+        """
+            Recomputes the neighbor counts and the mine and safe square totals after mines are placed.
+        """
+        self.counts = count_neighbors(self.mines)
+        self.mine_count = int(np.count_nonzero(self.mines))
+        self.flagged_mines = int(np.count_nonzero(self.mines & self.flagged))
+        self.safe_remaining = int(np.count_nonzero(~self.mines & ~self.clicked))
+
+    def remove_mine(self, row, col):
+        """
+            Removes a mine and updates the counts of the 3x3 block around it.
+        """
+        self.mines[row, col] = False
+        self.mine_count -= 1
+        self.flagged_mines -= int(self.flagged[row, col])
+        if not self.clicked[row, col]:
+            self.safe_remaining += 1
+        own = self.counts[row, col]
+        self.counts[max(row - 1, 0):row + 2, max(col - 1, 0):col + 2] -= 1
+        self.counts[row, col] = own
+
+
+class ArraySquare:
+    """
+        A lightweight view of one square of an ArrayBoard.
+        Reads and writes go straight through to the board's arrays.
+    """
+    __slots__ = ('board', 'row', 'col')
+
+    def __init__(self, board, row, col):
+        self.board = board
+        self.row = row
+        self.col = col
+
+    @property
+    def mine(self):
+        return bool(self.board.mines[self.row, self.col])
+
+    @property
+    def clicked(self):
+        return bool(self.board.clicked[self.row, self.col])
+
+    @property
+    def flagged(self):
+        return bool(self.board.flagged[self.row, self.col])
+
+    def mine_neighbors(self):
+        return int(self.board.counts[self.row, self.col])
+
+    def get_coords(self):
+        return self.row, self.col
+
+    def as_int(self):
+        if self.clicked:
+            return self.mine_neighbors()
+
+    def flag_square(self):
+        self.board.toggle_flag(self.row, self.col)
+
+    def __eq__(self, other):
+        return (isinstance(other, ArraySquare) and self.board is other.board
+                and self.row == other.row and self.col == other.col)
+
+    def __hash__(self):
+        return hash((id(self.board), self.row, self.col))
+
+
+def count_neighbors(mines):
+    """
+        Vectorized 3x3 convolution returning, for every square, how many of its neighbors are mines.
+        The last two axes are rows and cols, so a stack of boards is counted in one call.
+    """
+    rows, cols = mines.shape[-2:]
+    padding = [(0, 0)] * (mines.ndim - 2) + [(1, 1), (1, 1)]
+    padded = np.pad(mines.astype(np.uint8), padding)
+    counts = np.zeros(mines.shape, dtype=np.uint8)
+    for dr in range(3):
+        for dc in range(3):
+            if dr != 1 or dc != 1:
+                counts += padded[..., dr:dr + rows, dc:dc + cols]
+    return counts
@@ -0,0 +1,162 @@
+import numpy as np
+
+from arrayboard import count_neighbors
+from gameplay import GameState
+
+"""
+    Vectorized simulator that plays many games of Minesweeper at once.
+    Every game is a layer of stacked (games x rows x cols) arrays, and clicks, flood fills
+    and the simple deterministic deductions are applied to all layers with array operations.
+"""
+
+
+class BatchSimulator:
+    """
+        Holds a batch of games and plays them all to the end.
+
+        Each turn, every ongoing game flags the hidden neighbors of numbers that already see
+        as many hidden squares as they have mines left, opens the hidden neighbors of numbers
+        whose mines are all flagged, and, when neither applies, clicks a random hidden square.
+
+        The board arrays only hold the games still being played: once fewer than half of them
+        are ongoing, finished games are copied into game_state, moves and guesses and dropped,
+        so the long tail of slow games does not pay for the whole batch.
+    """
+
+    def __init__(self, games, rows, cols, number_of_mines=10, seed=None, first_click=None):
+        self.games = games
+        self.rows = rows
+        self.cols = cols
+        self.number_of_mines = number_of_mines
+        self.random = np.random.default_rng(seed)
+        self.first_click = first_click or (rows // 2, cols // 2)
+        self.mines = random_layouts(self.random, games, rows, cols, number_of_mines)
+        self.clicked = np.zeros((games, rows, cols), dtype=bool)
+        self.flagged = np.zeros((games, rows, cols), dtype=bool)
+        self.counts = count_neighbors(self.mines)
+        self.game_state = np.full(games, GameState.START.value, dtype=np.int8)
+        self.moves = np.zeros(games, dtype=np.int32)
+        self.guesses = np.zeros(games, dtype=np.int32)
+        self.active = np.arange(games)
+        self.state = self.game_state.copy()
+        self.active_moves = self.moves.copy()
+        self.active_guesses = self.guesses.copy()
+
+    def run(self):
+        """
+            Plays every game to a win or a loss and returns the array of final GameState values.
+        """
+        row, col = self.first_click
+        self.mines[:, row, col] = False
+        self.counts = count_neighbors(self.mines)
+        first = np.zeros_like(self.clicked)
+        first[:, row, col] = True
+        self.state[:] = GameState.ONGOING.value
+        self.active_guesses += 1
+        self.reveal(first)
+
+        while True:
+            ongoing = self.state == GameState.ONGOING.value
+            if not ongoing.any():
+                self.compact(ongoing)
+                return self.game_state
+            if 2 * np.count_nonzero(ongoing) < len(ongoing):
+                self.compact(ongoing)
+                ongoing = self.state == GameState.ONGOING.value
+            flags, opens = self.deduce(ongoing)
+            self.flagged |= flags
+            stuck = ongoing & ~opens.any(axis=(1, 2)) & ~flags.any(axis=(1, 2))
+            if stuck.any():
+                opens |= self.guess(stuck)
+                self.active_guesses += stuck
+            self.reveal(opens)
+
+    def compact(self, keep):
+        """
+            Records the results of the games being dropped and keeps only the games in keep.
+        """
+        self.game_state[self.active] = self.state
+        self.moves[self.active] = self.active_moves
+        self.guesses[self.active] = self.active_guesses
+        self.active = self.active[keep]
+        self.state = self.state[keep]
+        self.active_moves = self.active_moves[keep]
+        self.active_guesses = self.active_guesses[keep]
+        self.mines = self.mines[keep]
+        self.clicked = self.clicked[keep]
+        self.flagged = self.flagged[keep]
+        self.counts = self.counts[keep]
+
+    def deduce(self, ongoing):
+        """
+            Returns (flags, opens): the hidden squares proven to be mines and proven to be safe.
+        """
+        hidden = ~self.clicked & ~self.flagged & ongoing[:, None, None]
+        hidden_around = count_neighbors(hidden)
+        flags_around = count_neighbors(self.flagged)
+        numbers = self.clicked & ~self.mines & (hidden_around > 0)
+        all_mines = numbers & (self.counts == hidden_around + flags_around)
+        all_safe = numbers & (self.counts == flags_around)
+        flags = hidden & (count_neighbors(all_mines) > 0)
+        opens = hidden & (count_neighbors(all_safe) > 0) & ~flags
+        return flags, opens
+
+    def guess(self, stuck):
+        """
+            Picks one random hidden square for every stuck game.
+        """
+        hidden = ~self.clicked & ~self.flagged & stuck[:, None, None]
+        keys = np.where(hidden, self.random.random(hidden.shape), -1.0)
+        picks = np.argmax(keys.reshape(len(stuck), -1), axis=1)
+        opens = np.zeros(hidden.size, dtype=bool)
+        opens[np.flatnonzero(stuck) * self.rows * self.cols + picks[stuck]] = True
+        return opens.reshape(hidden.shape)
+
+    def reveal(self, opens):
+        """
+            Clicks the given squares in every game at once, flood fills their zero regions
+            and updates the win and lose state.
+        """
+        self.active_moves += opens.any(axis=(1, 2))
+        lost = (opens & self.mines).any(axis=(1, 2))
+        self.clicked |= opens
+        opened = opens & ~self.mines
+        while opened.any():
+            zeros = opened & (self.counts == 0)
+            opened = (count_neighbors(zeros) > 0) & ~self.clicked & ~self.mines
+            self.clicked |= opened
+
+        ongoing = self.state == GameState.ONGOING.value
+        hidden_safe = (~self.mines & ~self.clicked).any(axis=(1, 2))
+        all_flagged = (self.flagged == self.mines).all(axis=(1, 2))
+        self.state[ongoing & lost] = GameState.LOSE.value
+        self.state[ongoing & ~lost & (~hidden_safe | all_flagged)] = GameState.WIN.value
+
+
+def random_layouts(generator, games, rows, cols, number_of_mines):
+    """
+        Samples games independent mine layouts at once, each with exactly number_of_mines mines,
+        by taking the smallest number_of_mines of one random key per square.
+    """
+    cells = rows * cols
+    mines = np.zeros((games, cells), dtype=bool)
+    if number_of_mines >= cells:
+        mines[:] = True
+    elif number_of_mines > 0:
+        keys = generator.random((games, cells))
+        picks = np.argpartition(keys, number_of_mines, axis=1)[:, :number_of_mines]
+        np.put_along_axis(mines, picks, True, axis=1)
+    return mines.reshape(games, rows, cols)
+
+
+def simulate(games, rows, cols, number_of_mines=10, seed=None, batch_size=10000):
+    """
+        Plays games games in batches of batch_size and returns (games won, games played).
+    """
+    seeds = np.random.SeedSequence(seed).spawn((games + batch_size - 1) // batch_size)
+    wins = 0
+    for i, batch_seed in enumerate(seeds):
+        size = min(batch_size, games - i * batch_size)
+        states = BatchSimulator(size, rows, cols, number_of_mines, seed=batch_seed).run()
+        wins += int(np.count_nonzero(states == GameState.WIN.value))
+    return wins, games
@@ -0,0 +1,181 @@
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+from contextlib import redirect_stdout
+
+from gameplay import Board
+from msweep import Round
+
+"""
+    Benchmarks for the board and solver hot paths.
+
+    python3 bench.py --output before.json
+    python3 bench.py --output after.json
+    python3 bench.py --compare before.json after.json
+"""
+
+SIZES = [(9, 9), (16, 30), (100, 100), (1000, 1000)]
+DENSITIES = [0.12, 0.2]
+
+
+def measure(setup, run, min_time=0.2, max_repeat=50, reuse=False, max_time=None):
+    """
+        Calls setup() and then times run(setup_result), repeating until min_time has been
+        spent in run or max_repeat runs are done (always at least once).
+        With reuse, setup runs once and every repeat gets the same state; only cases whose run
+        leaves the state unchanged can do that. Otherwise no new repeat starts once setup and
+        run together have taken max_time (default 5 * min_time), so slow setups on huge boards
+        are not repeated dozens of times.
+        Returns the list of timings in seconds.
+    """
+    if max_time is None:
+        max_time = 5 * min_time
+    state = setup() if reuse else None
+    start = time.perf_counter()
+    timings = []
+    while not timings or (len(timings) < max_repeat and sum(timings) < min_time
+                          and time.perf_counter() - start < max_time):
+        if not reuse:
+            state = setup()
+        t0 = time.perf_counter()
+        run(state)
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def safe_number(board):
+    """ Return a square that is neither a mine nor a zero, so clicking it reveals only itself."""
+    for row in board.squares:
+        for square in row:
+            if not square.mine and square.mine_neighbors():
+                return square.get_coords()
+    return 0, 0
+
+
+def started_round(rows, cols, mines, seed, strategy):
+    board = Board(rows, cols, mines, seed=seed)
+    current_round = Round(board, strategy=strategy)
+    current_round.reveal(board.click(rows // 2, cols // 2))
+    return current_round
+
+
+def print_board(board):
+    with redirect_stdout(io.StringIO()):
+        board.print_board(board.print_square)
+
+
+def play_games(rows, cols, mines, seed, games):
+    for i in range(games):
+        Round(Board(rows, cols, mines, seed=seed + i)).play()
+
+
+def cases(rows, cols, mines, seed):
+    """
+        Yields (name, setup, run, reuse) for every benchmark at one board size and mine count;
+        reuse is True when run does not change the state setup built.
+    """
+    board = lambda: Board(rows, cols, mines, seed=seed)
+    yield "construct", lambda: None, lambda _: board(), True
+    yield "click", lambda: (lambda b: (b, safe_number(b)))(board()), lambda state: state[0].click(*state[1]), False
+    yield "flood_fill", lambda: Board(rows, cols, 0, seed=seed), lambda b: b.click(0, 0), False
+    yield "winner", board, lambda b: b.winner(), True
+    yield "print_board", board, print_board, True
+    yield "choose_bestnext", lambda: started_round(rows, cols, mines, seed, "best"), lambda r: r.choose(), False
+    yield "choose_exactnext", lambda: started_round(rows, cols, mines, seed, "exact"), lambda r: r.choose(), False
+    games = max(1, 2000 // (rows * cols))
+    yield "full_game_x%d" % games, lambda: None, lambda _: play_games(rows, cols, mines, seed, games), True
+
+
+def run_benchmarks(sizes, densities, seed=0, min_time=0.2, only=None):
+    """
+        Runs every case for every size and density and returns the list of result records.
+    """
+    results = []
+    for rows, cols in sizes:
+        for density in densities:
+            mines = int(density * rows * cols)
+            for name, setup, run, reuse in cases(rows, cols, mines, seed):
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                timings = measure(setup, run, min_time=min_time, reuse=reuse)
+                results.append({
+                    "case": name,
+                    "rows": rows,
+                    "cols": cols,
+                    "density": density,
+                    "mines": mines,
+                    "repeat": len(timings),
+                    "best": min(timings),
+                    "median": statistics.median(timings),
+                })
+                print("%-18s %5dx%-5d %5.2f  best %.6fs  median %.6fs  (%d runs)" % (
+                    name, rows, cols, density, min(timings), statistics.median(timings), len(timings)),
+                    file=sys.stderr)
+    return results
+
+
+def compare(before, after, threshold=0.1):
+    """
+        Prints the median ratio after/before of every case found in both runs.
+        Returns the cases that got slower by more than threshold.
+    """
+    key = lambda result: (result["case"], result["rows"], result["cols"], result["density"])
+    old = {key(result): result for result in before["results"]}
+    regressions = []
+    for result in after["results"]:
+        if key(result) not in old:
+            continue
+        ratio = result["median"] / old[key(result)]["median"]
+        mark = ""
+        if ratio > 1 + threshold:
+            mark = "  REGRESSION"
+            regressions.append(key(result))
+        print("%-18s %5dx%-5d %5.2f  %.6fs -> %.6fs  x%.2f%s" % (
+            key(result) + (old[key(result)]["median"], result["median"], ratio, mark)))
+    return regressions
+
+
+def parse_sizes(text):
+    return [tuple(int(n) for n in size.split("x")) for size in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Minesweeper board and solver.")
+    parser.add_argument("--sizes", type=parse_sizes, default=SIZES, help="e.g. 9x9,16x30")
+    parser.add_argument("--densities", type=lambda text: [float(d) for d in text.split(",")], default=DENSITIES)
+    parser.add_argument("--cases", type=lambda text: text.split(","), default=None,
+                        help="only run cases whose name starts with one of these")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--output", help="write results as JSON to this file instead of stdout")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        return 1 if compare(before, after, args.threshold) else 0
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "results": run_benchmarks(args.sizes, args.densities, args.seed, args.min_time, args.cases),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
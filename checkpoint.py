@@ -0,0 +1,97 @@
+import os
+import json
+
+from instrument import Stats
+
+"""
+    Checkpoints for long solver runs, so an interrupted run can resume where it left off.
+"""
+
+
+class Checkpoint:
+    """
+        Progress of a solver run: the seed ranges already played, the win and game tallies,
+        the instrumentation totals and how long the output files were when it was taken.
+
+        On resume, output files are cut back to those lengths, so games finished after the
+        last checkpoint are played again without being written twice.
+    """
+
+    def __init__(self, path, config):
+        self.path = path
+        self.config = config
+        self.completed = []
+        self.game_count = 0
+        self.win_count = 0
+        self.stats = None
+        self.file_sizes = {}
+
+    @classmethod
+    def load(cls, path, config):
+        """
+            Returns the checkpoint saved at path, or a fresh one if there is none.
+            Raises ValueError if the saved run was started with a different config.
+        """
+        checkpoint = cls(path, config)
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path) as f:
+            data = json.load(f)
+        if data["config"] != config:
+            raise ValueError('Checkpoint was written by a run with different settings.')
+        checkpoint.completed = [tuple(done) for done in data["completed"]]
+        checkpoint.game_count = data["game_count"]
+        checkpoint.win_count = data["win_count"]
+        checkpoint.stats = Stats.from_dict(data["stats"]) if data["stats"] else None
+        checkpoint.file_sizes = data["file_sizes"]
+        return checkpoint
+
+    def save(self):
+        """
+            Writes the checkpoint atomically, so a crash mid-write keeps the previous one.
+        """
+        data = {
+            "config": self.config,
+            "completed": self.completed,
+            "game_count": self.game_count,
+            "win_count": self.win_count,
+            "stats": self.stats.as_dict() if self.stats else None,
+            "file_sizes": self.file_sizes,
+        }
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+
+    def is_done(self, seeds):
+        return any(start <= seeds.start and seeds.stop <= stop for start, stop in self.completed)
+
+    def mark_done(self, seeds):
+        """
+            Adds a seed range to the completed ones, merging ranges that touch.
+        """
+        merged = []
+        start, stop = seeds.start, seeds.stop
+        for low, high in self.completed:
+            if high < start or stop < low:
+                merged.append((low, high))
+            else:
+                start, stop = min(start, low), max(stop, high)
+        merged.append((start, stop))
+        self.completed = sorted(merged)
+
+    def restore_file(self, path):
+        """
+            Cuts an output file back to its length at the checkpoint, dropping anything
+            written after the checkpoint was taken.
+        """
+        if path not in self.file_sizes:
+            return
+        if os.path.exists(path) and os.path.getsize(path) > self.file_sizes[path]:
+            os.truncate(path, self.file_sizes[path])
+
+    def record_file(self, path):
+        """ Records the current length of an output file, 0 if it does not exist yet."""
+        self.file_sizes[path] = os.path.getsize(path) if os.path.exists(path) else 0
@@ -0,0 +1,371 @@
+import random
+from collections import OrderedDict, deque
+
+from gameplay import GameState
+
+"""
+    Board for huge or unbounded grids, generated lazily one chunk at a time.
+
+    The grid is cut into chunk_size x chunk_size chunks. A chunk's mines are drawn from its
+    own seed, made from the board seed and the chunk position, the first time any of its
+    squares is looked at, so any chunk can be dropped and regenerated identically later.
+    Chunks the game has changed (clicked, flagged, or a mine removed) are kept; unchanged
+    ones sit in a bounded LRU and are evicted, so memory follows the explored area.
+"""
+
+# Stand-in size of an unbounded board, for the counters that the Board API exposes.
+UNBOUNDED_CELLS = 1 << 62
+UNCOUNTED = 255
+
+
+class Chunk:
+    """
+        One chunk's mines, clicked squares and flags, indexed by row * chunk_size + col.
+        counts caches the number of mines around each square, UNCOUNTED until first asked.
+    """
+    __slots__ = ('mines', 'clicked', 'flagged', 'counts')
+
+    def __init__(self, size):
+        self.mines = bytearray(size * size)
+        self.clicked = bytearray(size * size)
+        self.flagged = bytearray(size * size)
+        self.counts = bytearray(b"\xff") * (size * size)
+
+
+class ChunkBoard:
+    """
+        Creates a playable board with the Board API whose squares exist only once looked at.
+        rows and cols may be None for a board without bounds in that direction (negative
+        coordinates included). Every chunk holds round(density * squares) mines.
+        seed works as for gameplay.Board and must be an int or None.
+    """
+
+    def __init__(self, rows=None, cols=None, density=0.15, seed=None, chunk_size=32, max_clean_chunks=1024):
+        self.rows = rows
+        self.cols = cols
+        self.density = density
+        self.chunk_size = chunk_size
+        self.max_clean_chunks = max_clean_chunks
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.random = random.Random(self.seed)
+        self.game_state = GameState.START
+        self.dirty = {}
+        self.clean = OrderedDict()
+        self.cells = rows * cols if rows is not None and cols is not None else UNBOUNDED_CELLS
+        self.mine_count = self.count_mines()
+        self.number_of_mines = self.mine_count
+        self.safe_remaining = self.cells - self.mine_count
+        self.flag_count = 0
+        self.flagged_mines = 0
+
+    def count_mines(self):
+        """ Return the number of mines on the board before the first click."""
+        if self.cells == UNBOUNDED_CELLS:
+            return round(self.density * self.cells)
+        total = 0
+        for rows, row_chunks in chunk_spans(self.rows, self.chunk_size):
+            for cols, col_chunks in chunk_spans(self.cols, self.chunk_size):
+                total += row_chunks * col_chunks * round(self.density * rows * cols)
+        return total
+
+    def get_chunk(self, chunk_row, chunk_col):
+        """ Return the chunk at the given chunk coordinates, generating it if it is not held."""
+        key = (chunk_row, chunk_col)
+        chunk = self.dirty.get(key)
+        if chunk is not None:
+            return chunk
+        chunk = self.clean.get(key)
+        if chunk is not None:
+            self.clean.move_to_end(key)
+            return chunk
+        chunk = self.make_chunk(chunk_row, chunk_col)
+        self.clean[key] = chunk
+        if len(self.clean) > self.max_clean_chunks:
+            self.clean.popitem(last=False)
+        return chunk
+
+    def make_chunk(self, chunk_row, chunk_col):
+        size = self.chunk_size
+        rows = size if self.rows is None else min(size, self.rows - chunk_row * size)
+        cols = size if self.cols is None else min(size, self.cols - chunk_col * size)
+        chunk = Chunk(size)
+        rng = random.Random("%d:%d:%d" % (self.seed, chunk_row, chunk_col))
+        for cell in rng.sample(range(rows * cols), round(self.density * rows * cols)):
+            row, col = divmod(cell, cols)
+            chunk.mines[row * size + col] = 1
+        return chunk
+
+    def touch(self, row, col):
+        """ Return (chunk, index) for a square the game is about to change, keeping its chunk."""
+        chunk_row, local_row = divmod(row, self.chunk_size)
+        chunk_col, local_col = divmod(col, self.chunk_size)
+        key = (chunk_row, chunk_col)
+        if key not in self.dirty:
+            self.dirty[key] = self.get_chunk(chunk_row, chunk_col)
+            self.clean.pop(key, None)
+        return self.dirty[key], local_row * self.chunk_size + local_col
+
+    def locate(self, row, col):
+        """ Return (chunk, index) for reading a square."""
+        chunk_row, local_row = divmod(row, self.chunk_size)
+        chunk_col, local_col = divmod(col, self.chunk_size)
+        return self.get_chunk(chunk_row, chunk_col), local_row * self.chunk_size + local_col
+
+    def is_mine(self, row, col):
+        chunk, index = self.locate(row, col)
+        return chunk.mines[index] == 1
+
+    def is_clicked(self, row, col):
+        chunk, index = self.locate(row, col)
+        return chunk.clicked[index] == 1
+
+    def is_flagged(self, row, col):
+        chunk, index = self.locate(row, col)
+        return chunk.flagged[index] == 1
+
+    def neighbor_mines(self, row, col):
+        chunk, index = self.locate(row, col)
+        count = chunk.counts[index]
+        if count == UNCOUNTED:
+            count = chunk.counts[index] = sum(self.is_mine(r, c) for r, c in self.get_neighbor_coords(row, col))
+        return count
+
+    def click(self, row, col):
+        """
+            Clicks the square and, if the square does not contain a mine, also clicks its neighbors that do not contain mines.
+            If the first square you click is a mine, instead remove that mine from the game.
+            Returns the coordinates of every square newly revealed by this click.
+        """
+        if not self.is_valid_square(row, col):
+            raise IndexError('Not on the board.')
+        if self.is_clicked(row, col) or self.game_state in [GameState.WIN, GameState.LOSE]:
+            return []
+
+        chunk, index = self.touch(row, col)
+        if self.game_state == GameState.START:
+            if chunk.mines[index]:
+                chunk.mines[index] = 0
+                for r, c in self.get_neighbor_coords(row, col):
+                    neighbor_chunk, neighbor_index = self.locate(r, c)
+                    neighbor_chunk.counts[neighbor_index] = UNCOUNTED
+                self.mine_count -= 1
+                self.flagged_mines -= chunk.flagged[index]
+                self.safe_remaining += 1
+            self.game_state = GameState.ONGOING
+        chunk.clicked[index] = 1
+        revealed = [(row, col)]
+
+        if chunk.mines[index]:
+            self.game_state = GameState.LOSE
+            return revealed
+        self.safe_remaining -= 1
+        if self.neighbor_mines(row, col) == 0:
+            self.reveal_zeros(row, col, revealed)
+        if self.winner():
+            self.game_state = GameState.WIN
+        return revealed
+
+    def reveal_zeros(self, row, col, revealed):
+        """
+            Opens the region of zero squares around (row, col), plus its numbered border.
+            Newly revealed coordinates are appended to revealed.
+        """
+        queue = deque([(row, col)])
+        while queue:
+            r, c = queue.popleft()
+            for nr, nc in self.get_neighbor_coords(r, c):
+                chunk, index = self.locate(nr, nc)
+                if chunk.clicked[index] or chunk.mines[index]:
+                    continue
+                chunk, index = self.touch(nr, nc)
+                chunk.clicked[index] = 1
+                self.safe_remaining -= 1
+                revealed.append((nr, nc))
+                if self.neighbor_mines(nr, nc) == 0:
+                    queue.append((nr, nc))
+
+    def print_board(self, print_square):
+        """
+        Prints the border of the board, showing the numbers associated with row and column.
+        Only meant for bounded boards small enough to print.
+        """
+        print("\n")
+        col_print = "    "
+        for i in range(0, self.cols):
+            col_print += str(i) + "  "
+        print(col_print + "\n")
+        for i in range(self.rows):
+            row_print = str(i) + "  "
+            for j in range(self.cols):
+                row_print += print_square(self.get_square(i, j))
+            print(row_print + "\n")
+
+    def print_square(self, square):
+        if square.clicked:
+            if square.mine_neighbors() == 0:
+                return " . "
+            return " " + str(square.mine_neighbors()) + " "
+        elif square.flagged:
+            return " f "
+        return " X "
+
+    def print_solution(self, square):
+        if square.mine:
+            return " M "
+        return self.print_square(square)
+
+    def get_dimensions(self):
+        return self.rows, self.cols
+
+    def winner(self):
+        """
+        Establishes the win condition, where all the remaining unclicked squares
+        on the board must be mines, or every mine (and nothing else) has been flagged.
+        """
+        return self.safe_remaining == 0 or self.flag_count == self.flagged_mines == self.mine_count
+
+    def toggle_flag(self, row, col):
+        """
+            Flags or unflags the square, winning the game once exactly the mines are flagged.
+        """
+        chunk, index = self.touch(row, col)
+        chunk.flagged[index] ^= 1
+        step = 1 if chunk.flagged[index] else -1
+        self.flag_count += step
+        if chunk.mines[index]:
+            self.flagged_mines += step
+        if self.game_state == GameState.ONGOING and self.winner():
+            self.game_state = GameState.WIN
+
+    def get_square(self, row, col):
+        """ Return a view of the square at the given row and column."""
+        return ChunkSquare(self, row, col)
+
+    def is_unknown(self, square):
+        return not square.clicked and not square.flagged
+
+    def get_neighbor_coords(self, row, col):
+        """ Return the coordinates of the squares around (row, col) that are on the board."""
+        return [(r, c)
+                for r in range(row - 1, row + 2)
+                for c in range(col - 1, col + 2)
+                if (r != row or c != col) and self.is_valid_square(r, c)]
+
+    def get_neighboring_squares(self, square):
+        r, c = square.get_coords()
+        return [self.get_square(nr, nc) for nr, nc in self.get_neighbor_coords(r, c)]
+
+    def is_valid_square(self, row, col):
+        return ((self.rows is None or 0 <= row < self.rows)
+                and (self.cols is None or 0 <= col < self.cols))
+
+    def unopened(self):
+        """ Return an Unopened set of every square, for msweep.Round's interior."""
+        return Unopened(self)
+
+
+class ChunkSquare:
+    """
+        A lightweight view of one square of a ChunkBoard.
+    """
+    __slots__ = ('board', 'row', 'col')
+
+    def __init__(self, board, row, col):
+        self.board = board
+        self.row = row
+        self.col = col
+
+    @property
+    def mine(self):
+        return self.board.is_mine(self.row, self.col)
+
+    @property
+    def clicked(self):
+        return self.board.is_clicked(self.row, self.col)
+
+    @property
+    def flagged(self):
+        return self.board.is_flagged(self.row, self.col)
+
+    def mine_neighbors(self):
+        return self.board.neighbor_mines(self.row, self.col)
+
+    def get_coords(self):
+        return self.row, self.col
+
+    def as_int(self):
+        if self.clicked:
+            return self.mine_neighbors()
+
+    def flag_square(self):
+        self.board.toggle_flag(self.row, self.col)
+
+
+class Unopened:
+    """
+        The squares of a ChunkBoard not yet taken out of it, stored as the set of squares that
+        were removed, so it costs memory for the explored area only. Iterating yields random
+        squares still in it: anywhere on a bounded board, and on an unbounded one within a
+        chunk of the squares removed so far, whose bounds are kept as squares are removed.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.removed = set()
+        self.bounds = None
+
+    def __contains__(self, cell):
+        return cell not in self.removed and self.board.is_valid_square(cell[0], cell[1])
+
+    def __len__(self):
+        return self.board.cells - len(self.removed)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def discard(self, cell):
+        """ Takes cell out, widening the running (low row, high row, low col, high col) bounds."""
+        self.removed.add(cell)
+        row, col = cell
+        if self.bounds is None:
+            self.bounds = [row, row, col, col]
+            return
+        bounds = self.bounds
+        if row < bounds[0]:
+            bounds[0] = row
+        elif row > bounds[1]:
+            bounds[1] = row
+        if col < bounds[2]:
+            bounds[2] = col
+        elif col > bounds[3]:
+            bounds[3] = col
+
+    def remove(self, cell):
+        if cell not in self:
+            raise KeyError(cell)
+        self.discard(cell)
+
+    def __iter__(self):
+        board = self.board
+        spread = board.chunk_size
+        low_row, high_row, low_col, high_col = self.bounds or (0, 0, 0, 0)
+        if board.rows is not None:
+            low_row, high_row = 0, board.rows - 1
+        else:
+            low_row, high_row = low_row - spread, high_row + spread
+        if board.cols is not None:
+            low_col, high_col = 0, board.cols - 1
+        else:
+            low_col, high_col = low_col - spread, high_col + spread
+        while len(self):
+            cell = (board.random.randint(low_row, high_row), board.random.randint(low_col, high_col))
+            if cell in self:
+                yield cell
+
+
+def chunk_spans(length, size):
+    """ Yields (squares, chunks): how many chunks of each length a side of the board splits into."""
+    if length // size:
+        yield size, length // size
+    if length % size:
+        yield length % size, 1
@@ -0,0 +1,151 @@
+import os
+import mmap
+import struct
+from array import array
+from collections import namedtuple
+
+from gameplay import Board, GameState
+
+"""
+    Compact binary file of played games, for offline analysis and replays.
+
+    The file starts with a fixed header giving the board size and the record layout, followed
+    by fixed-width records. Each record holds the game seed, its result, the number of moves,
+    the starting mine bitmap (one bit per square) and the packed move list, where each move is
+    (row * cols + col) * 2 + flag in a 16 or 32 bit slot. Because every record is the same size,
+    any game can be read directly from a memory map without loading the rest of the file.
+"""
+
+MAGIC = b"MSWP"
+HEADER = struct.Struct("<4sHIIII")
+HEADER_SIZE = 32
+RECORD = struct.Struct("<qBI")
+
+GameEntry = namedtuple("GameEntry", ["seed", "result", "mines", "moves"])
+
+
+class GameFormat:
+    """
+        The record layout for boards of one size.
+    """
+
+    def __init__(self, rows, cols, max_moves=None):
+        self.rows = rows
+        self.cols = cols
+        self.max_moves = max_moves if max_moves is not None else rows * cols
+        self.bitmap_size = (rows * cols + 7) // 8
+        self.move_type = "H" if 2 * rows * cols <= 0xFFFF else "I"
+        self.move_size = array(self.move_type).itemsize
+        self.record_size = RECORD.size + self.bitmap_size + self.max_moves * self.move_size
+
+    def header(self):
+        return HEADER.pack(MAGIC, 1, self.rows, self.cols, self.max_moves, self.record_size).ljust(HEADER_SIZE, b"\0")
+
+    @classmethod
+    def from_header(cls, data):
+        magic, version, rows, cols, max_moves, record_size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != 1:
+            raise ValueError('Not a game record file.')
+        layout = cls(rows, cols, max_moves)
+        if layout.record_size != record_size:
+            raise ValueError('Corrupt game record header.')
+        return layout
+
+    def pack(self, seed, result, mines, moves):
+        """
+            Packs one game: its seed, final GameState, starting mine coordinates and the list
+            of (row, col, flag) moves in the order they were played.
+        """
+        if len(moves) > self.max_moves:
+            raise ValueError('Game has more moves than the record can hold.')
+        bitmap = 0
+        for row, col in mines:
+            bitmap |= 1 << (row * self.cols + col)
+        packed = array(self.move_type, [(row * self.cols + col) * 2 + flag for row, col, flag in moves])
+        packed.extend([0] * (self.max_moves - len(moves)))
+        return (RECORD.pack(-1 if seed is None else seed, result.value, len(moves))
+                + bitmap.to_bytes(self.bitmap_size, "little") + packed.tobytes())
+
+    def unpack(self, data, offset=0):
+        seed, result, count = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        bitmap = int.from_bytes(data[offset:offset + self.bitmap_size], "little")
+        offset += self.bitmap_size
+        packed = array(self.move_type)
+        packed.frombytes(data[offset:offset + count * self.move_size])
+        mines = []
+        while bitmap:
+            low = bitmap & -bitmap
+            mines.append(divmod(low.bit_length() - 1, self.cols))
+            bitmap ^= low
+        moves = [divmod(move >> 1, self.cols) + (move & 1,) for move in packed]
+        return GameEntry(None if seed == -1 else seed, GameState(result), mines, moves)
+
+
+class GameWriter:
+    """
+        Appends packed games to a file, writing the header if the file is new.
+    """
+
+    def __init__(self, path, rows, cols, max_moves=None):
+        self.layout = GameFormat(rows, cols, max_moves)
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            with open(path, "rb") as f:
+                existing = GameFormat.from_header(f.read(HEADER_SIZE))
+            if existing.header() != self.layout.header():
+                raise ValueError('File holds games of a different size.')
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(self.layout.header())
+
+    def write(self, packed_games):
+        for packed in packed_games:
+            self.file.write(packed)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class GameReader:
+    """
+        Memory-maps a game file; games can be indexed, counted and iterated without loading the file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.layout = GameFormat.from_header(self.map[:HEADER_SIZE])
+
+    def __len__(self):
+        return (len(self.map) - HEADER_SIZE) // self.layout.record_size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('No such game.')
+        return self.layout.unpack(self.map, HEADER_SIZE + index * self.layout.record_size)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def replay(self, index):
+        """
+            Rebuilds the board of a recorded game and plays its moves again; returns the Board.
+        """
+        entry = self[index]
+        board = Board(self.layout.rows, self.layout.cols, number_of_mines=0)
+        board.set_mines(entry.mines)
+        for row, col, flag in entry.moves:
+            if flag:
+                board.get_square(row, col).flag_square()
+            else:
+                board.click(row, col)
+        return board
+
+    def close(self):
+        self.map.close()
+        self.file.close()
@@ -1,5 +1,7 @@
 import random
 import itertools
+from collections import OrderedDict, deque, namedtuple
+from functools import partial
 from enum import Enum
 
 """ 
@@ -21,47 +23,163 @@ class SquareType(Enum):
     EMPTY = ' . '
 
 
+# One entry of Board.undo_stack: the squares a click revealed, or the square a flag toggled,
+# the mine a first click removed, and the game state before the move.
+Move = namedtuple("Move", ["revealed", "flag", "removed_mine", "game_state"])
+
+# Board state packed into bitmaps with bit row * cols + col set for every mine, clicked and
+# flagged square, plus the game state and the undo stack depth when it was taken.
+Snapshot = namedtuple("Snapshot", ["mines", "clicked", "flagged", "game_state", "depth"])
+
+
 class Board:
     """ 
         Creates a playable board that can be clicked.
+        seed may be an int (or None) for a fresh random.Random, or a random.Random to draw from;
+        the same seed always produces the same mine layout.
+
+        Mines, clicked squares, flags and neighbor counts are kept in flat bytearrays indexed by
+        row * cols + col, and neighbors come from the Topology shared by every board of the
+        same shape. get_square returns a Square view onto those arrays.
+
+        Every click and flag is pushed onto undo_stack, so undo() can take moves back one at
+        a time for lookahead, and snapshot()/restore() save and reset the whole board.
     """
 
-    def __init__(self, rows, cols, number_of_mines=10):
+    def __init__(self, rows, cols, number_of_mines=10, seed=None):
         self.rows = rows
         self.cols = cols
         self.game_state = GameState.START
         self.number_of_mines = number_of_mines
+        self.seed = seed
+        self.random = seed if isinstance(seed, random.Random) else random.Random(seed)
         self.mines_coords = []
+        self.undo_stack = []
         self.make_board(self.cols, self.rows)
-        self.set_random_mines(self.cols, self.rows, self.number_of_mines)
+        self.set_random_mines(self.rows, self.cols, self.number_of_mines)
 
     def click(self, row, col):
         """ 
             Clicks the square and, if the square does not contain a mine, also clicks its neighbors that do not contain mines.
             If the first square you click is a mine, instead remove that mine from the game.
+            Returns the coordinates of every square newly revealed by this click.
         """
         if not self.is_valid_square(row, col):
             raise IndexError('Not on the board.')
-        if self.get_square(row, col).clicked:
-            return
-        
-        square = self.squares[row][col]
-        square.clicked = True
+        index = row * self.cols + col
+        if self.clicked[index] or self.game_state in [GameState.WIN, GameState.LOSE]:
+            return []
 
+        previous_state = self.game_state
+        removed_mine = None
         if self.game_state == GameState.START:
-            square.mine = False
+            if self.mines[index]:
+                self.remove_mine(row, col)
+                removed_mine = (row, col)
             self.game_state = GameState.ONGOING
-        if square.mine:
+        self.clicked[index] = 1
+        revealed = [(row, col)]
+        self.undo_stack.append(Move(revealed, None, removed_mine, previous_state))
+
+        if self.mines[index]:
             self.game_state = GameState.LOSE
-            return
-        if square.mine_neighbors() == 0:
-            for neighbor in self.get_neighboring_squares(square):
-                if not neighbor.mine:
-                    if neighbor.mine_neighbors() == 0:
-                        self.click(neighbor.row, neighbor.col)
-                    neighbor.clicked = True
+            return revealed
+        self.safe_remaining -= 1
+        if self.counts[index] == 0:
+            self.reveal_zeros([index], revealed)
         if self.winner():
             self.game_state = GameState.WIN
+        return revealed
+
+    def play_moves(self, clicks=(), flags=(), chords=()):
+        """
+            Applies many moves in one call and returns the set of newly revealed coordinates.
+            Every square in flags is toggled first. Then every square in clicks is opened, along
+            with the unflagged neighbors of every revealed number in chords that has as many
+            flags around it as its number (the usual chord rule). All openings share one reveal
+            pass, and the game state is settled once at the end.
+            Opening follows click: the first square opened in a new game never holds a mine,
+            and opening a mine loses, skipping the openings listed after it.
+            undo takes back the batch's flags one by one and its openings as one move.
+        """
+        for row, col in itertools.chain(clicks, flags, chords):
+            if not self.is_valid_square(row, col):
+                raise IndexError('Not on the board.')
+        if self.game_state in [GameState.WIN, GameState.LOSE]:
+            return set()
+        previous_state = self.game_state
+        cols = self.cols
+        mines, clicked, flagged, counts = self.mines, self.clicked, self.flagged, self.counts
+        for row, col in flags:
+            index = row * cols + col
+            self.undo_stack.append(Move([], (row, col), None, previous_state))
+            flagged[index] ^= 1
+            step = 1 if flagged[index] else -1
+            self.flag_count += step
+            if mines[index]:
+                self.flagged_mines += step
+
+        targets = [row * cols + col for row, col in clicks]
+        for row, col in chords:
+            index = row * cols + col
+            if not clicked[index] or mines[index]:
+                continue
+            neighbors = self.topology.neighbors[index]
+            if sum(flagged[j] for j in neighbors) == counts[index]:
+                targets.extend(j for j in neighbors if not flagged[j] and not clicked[j])
+
+        coords = self.topology.coords
+        revealed = []
+        zeros = []
+        removed_mine = None
+        for index in targets:
+            if clicked[index]:
+                continue
+            if self.game_state == GameState.START:
+                if mines[index]:
+                    removed_mine = coords[index]
+                    self.remove_mine(*removed_mine)
+                self.game_state = GameState.ONGOING
+            clicked[index] = 1
+            revealed.append(coords[index])
+            if mines[index]:
+                self.game_state = GameState.LOSE
+                break
+            self.safe_remaining -= 1
+            if counts[index] == 0:
+                zeros.append(index)
+        self.reveal_zeros(zeros, revealed)
+        if revealed:
+            self.undo_stack.append(Move(revealed, None, removed_mine, previous_state))
+        if self.game_state == GameState.ONGOING and self.winner():
+            self.game_state = GameState.WIN
+        return set(revealed)
+
+    def reveal_zeros(self, indexes, revealed):
+        """
+            Opens the regions of zero squares around the squares at indexes, plus their numbered
+            borders, visiting every square at most once. Newly revealed coordinates are appended to revealed.
+        """
+        neighbors, coords = self.topology.neighbors, self.topology.coords
+        mines, clicked, counts = self.mines, self.clicked, self.counts
+        queue = deque(indexes)
+        while queue:
+            for j in neighbors[queue.popleft()]:
+                if clicked[j] or mines[j]:
+                    continue
+                clicked[j] = 1
+                self.safe_remaining -= 1
+                revealed.append(coords[j])
+                if counts[j] == 0:
+                    queue.append(j)
+
+    @property
+    def squares(self):
+        """
+            The grid of Square views, for callers that walk every row. It is rebuilt on every
+            access, which costs O(rows * cols), so hold on to it rather than indexing it repeatedly.
+        """
+        return [[Square(self, row, col) for col in range(self.cols)] for row in range(self.rows)]
 
     def print_board(self, print_square):
         """
@@ -105,84 +223,213 @@ class Board:
     def winner(self):
         """
         Establishes the win condition, where all the remaining unclicked squares
-        on the board must be mines.
+        on the board must be mines, or every mine (and nothing else) has been flagged.
+        Both are tracked with counters, so this is O(1).
+        """
+        return self.safe_remaining == 0 or self.flag_count == self.flagged_mines == self.mine_count
 
-        !!  Does  not implement the secondary win mechanic where a player can win
-        a game by correctly flagging all mines.
+    def toggle_flag(self, row, col):
         """
-        for row in self.squares:
-            for square in row:
-                if not square.mine and not square.clicked:
-                    return False
-        return True
+            Flags or unflags the square, winning the game once exactly the mines are flagged.
+        """
+        index = row * self.cols + col
+        self.undo_stack.append(Move([], (row, col), None, self.game_state))
+        self.flagged[index] ^= 1
+        step = 1 if self.flagged[index] else -1
+        self.flag_count += step
+        if self.mines[index]:
+            self.flagged_mines += step
+        if self.game_state == GameState.ONGOING and self.winner():
+            self.game_state = GameState.WIN
+
+    def undo(self):
+        """
+            Takes back the last click or flag, returning the Move that was undone.
+        """
+        if not self.undo_stack:
+            raise IndexError('Nothing to undo.')
+        move = self.undo_stack.pop()
+        if move.flag:
+            index = move.flag[0] * self.cols + move.flag[1]
+            self.flagged[index] ^= 1
+            step = 1 if self.flagged[index] else -1
+            self.flag_count += step
+            if self.mines[index]:
+                self.flagged_mines += step
+        for row, col in move.revealed:
+            index = row * self.cols + col
+            self.clicked[index] = 0
+            if not self.mines[index]:
+                self.safe_remaining += 1
+        if move.removed_mine:
+            self.add_mine(*move.removed_mine)
+        self.game_state = move.game_state
+        return move
+
+    def snapshot(self):
+        """
+            Returns a Snapshot of the mines, clicked and flagged squares packed into bitmaps.
+        """
+        return Snapshot(pack_bits(self.mines), pack_bits(self.clicked), pack_bits(self.flagged),
+                        self.game_state, len(self.undo_stack))
+
+    def restore(self, snapshot):
+        """
+            Puts the board back to a Snapshot taken from it. Undo entries recorded after the
+            snapshot are dropped; if moves from before it were undone, the undo stack is cleared.
+        """
+        cells = self.rows * self.cols
+        mines = unpack_flags(snapshot.mines, cells)
+        self.clicked[:] = unpack_flags(snapshot.clicked, cells)
+        self.flagged[:] = unpack_flags(snapshot.flagged, cells)
+        if mines != self.mines:
+            coords = self.topology.coords
+            for index, (mine, current) in enumerate(zip(mines, self.mines)):
+                if mine and not current:
+                    self.add_mine(*coords[index])
+                elif current and not mine:
+                    self.remove_mine(*coords[index])
+        self.mine_count = snapshot.mines.bit_count()
+        self.flag_count = snapshot.flagged.bit_count()
+        self.flagged_mines = (snapshot.mines & snapshot.flagged).bit_count()
+        self.safe_remaining = cells - (snapshot.mines | snapshot.clicked).bit_count()
+        self.game_state = snapshot.game_state
+        if len(self.undo_stack) >= snapshot.depth:
+            del self.undo_stack[snapshot.depth:]
+        else:
+            self.undo_stack.clear()
 
     def get_square(self, row, col):
-        """ Return the square at the given row and column."""
-        return self.squares[row][col]
+        """ Return a Square view of the square at the given row and column."""
+        return Square(self, row, col)
 
     def is_unknown(self, square):
-        return self.print_square(square) == SquareType.UNKNOWN.value
+        return not square.clicked and not square.flagged
+
+    def get_neighbor_coords(self, row, col):
+        """ Return the coordinates of the squares around (row, col), from the shared topology."""
+        return self.topology.neighbor_coords[row * self.cols + col]
 
     def get_neighboring_squares(self, square):
-        assert type(square) is Square
-        r, c = square.get_coords()
-        row_neighbors = list(filter(lambda val: 0 <= val < self.rows, [r - 1, r, r + 1]))
-        col_neighbors = list(filter(lambda val: 0 <= val < self.cols, [c - 1, c, c + 1]))
-        neighbor_set = set(itertools.product(row_neighbors, col_neighbors))
-        neighbor_set.remove((r, c))
-        neighboring_squares = []
-        for coord in neighbor_set:
-            neighboring_squares.append(self.get_square(coord[0], coord[1]))
-        return neighboring_squares
+        return [Square(self, r, c) for r, c in self.topology.neighbor_coords[square.index]]
 
     def is_valid_square(self, row, col):
         return 0 <= row < self.rows and 0 <= col < self.cols
 
     def make_board(self, cols, rows):
         """
-            Create a grid of squares of size rows by cols.
+            Create the empty arrays for a board of size rows by cols.
         """
-        self.squares = [[Square(self, row, col)
-                        for col in range(cols)] for row in range(rows)]
+        cells = rows * cols
+        self.topology = topology(rows, cols)
+        self.mines = bytearray(cells)
+        self.clicked = bytearray(cells)
+        self.flagged = bytearray(cells)
+        self.counts = bytearray(cells)
+        self.safe_remaining = cells
+        self.mine_count = 0
+        self.flag_count = 0
+        self.flagged_mines = 0
 
-    def set_random_mines(self, row, col, number_of_mines):
-        for _ in range(number_of_mines):
-            cell = get_random(row, col)
-            while cell in self.mines_coords:
-                cell = get_random(row, col)
-            self.mines_coords.append(cell)
+    def set_random_mines(self, rows, cols, number_of_mines):
+        """
+            Places number_of_mines mines by sampling flat cell indices without replacement,
+            so placement is O(mines) whatever the density.
+        """
+        cells = self.random.sample(range(rows * cols), number_of_mines)
+        self.mines_coords = [divmod(cell, cols) for cell in cells]
         for sq in self.mines_coords:
-            sq_row = sq[0]
-            sq_col = sq[1]
-            self.squares[sq_row][sq_col].mine = True
+            self.add_mine(sq[0], sq[1])
 
     def set_mines(self, coords):
         """
         Used for testing purposes.
         """
         for coord in coords:
-            sq_row = coord[0]
-            sq_col = coord[1]
-            self.squares[sq_row][sq_col].mine = True
+            self.add_mine(coord[0], coord[1])
+
+    def add_mine(self, row, col):
+        """
+            Places a mine and bumps the neighbor count of the squares around it.
+        """
+        index = row * self.cols + col
+        if self.mines[index]:
+            return
+        self.mines[index] = 1
+        self.mine_count += 1
+        self.flagged_mines += self.flagged[index]
+        if not self.clicked[index]:
+            self.safe_remaining -= 1
+        counts = self.counts
+        for j in self.topology.neighbors[index]:
+            counts[j] += 1
+
+    def remove_mine(self, row, col):
+        """
+            Removes a mine and lowers the neighbor count of the squares around it.
+        """
+        index = row * self.cols + col
+        if not self.mines[index]:
+            return
+        self.mines[index] = 0
+        self.mine_count -= 1
+        self.flagged_mines -= self.flagged[index]
+        if not self.clicked[index]:
+            self.safe_remaining += 1
+        counts = self.counts
+        for j in self.topology.neighbors[index]:
+            counts[j] -= 1
 
 
 class Square:
     """
-        Represents a single square in the minesweeper board.
+        A view of a single square of a Board, reading and writing the board's arrays.
         A square may have a mine (or not), may be clicked (or not), and may be flagged (or not).
+        neighbor_mines is kept up to date by Board.add_mine and Board.remove_mine.
+        Views of the same square compare and hash equal, so they work in sets and as dict keys.
     """
+    __slots__ = ("board", "row", "col", "index")
+
     def __init__(self, board, row, col):
         self.board = board
         self.row = row
         self.col = col
-        self.mine = False
-        self.flagged = False
-        self.clicked = False
+        self.index = row * board.cols + col
+
+    @property
+    def mine(self):
+        return self.board.mines[self.index] == 1
+
+    @mine.setter
+    def mine(self, value):
+        self.board.mines[self.index] = bool(value)
+
+    @property
+    def clicked(self):
+        return self.board.clicked[self.index] == 1
+
+    @clicked.setter
+    def clicked(self, value):
+        self.board.clicked[self.index] = bool(value)
+
+    @property
+    def flagged(self):
+        return self.board.flagged[self.index] == 1
+
+    @flagged.setter
+    def flagged(self, value):
+        self.board.flagged[self.index] = bool(value)
+
+    @property
+    def neighbor_mines(self):
+        return self.board.counts[self.index]
+
+    @neighbor_mines.setter
+    def neighbor_mines(self, value):
+        self.board.counts[self.index] = value
 
     def mine_neighbors(self):
-        return len(list(filter(
-            lambda square: square.mine, self.board.get_neighboring_squares(self)
-        )))
+        return self.board.counts[self.index]
 
     def get_coords(self):
         return self.row, self.col
@@ -192,9 +439,88 @@ class Square:
             return self.mine_neighbors()
 
     def flag_square(self):
-        self.flagged = not self.flagged
+        self.board.toggle_flag(self.row, self.col)
+
+    def __eq__(self, other):
+        return isinstance(other, Square) and self.board is other.board and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.board), self.index))
+
+
+# Neighbor tables of one board shape: for every flat index row * cols + col, the flat indexes
+# and the coordinates of the squares around it, and the coordinates of the square itself.
+Topology = namedtuple("Topology", ["neighbors", "neighbor_coords", "coords"])
+TOPOLOGIES = OrderedDict()
+TOPOLOGY_CACHE = 16
+TABLE_CELLS = 2048
+
+
+class Computed:
+    """ A read-only sequence whose items are computed from the index on every access."""
+    __slots__ = ("item",)
+
+    def __init__(self, item):
+        self.item = item
+
+    def __getitem__(self, index):
+        return self.item(index)
+
+
+def neighbor_indexes(rows, cols, index):
+    """ Return the flat indexes of the squares around index that are on the board."""
+    row, col = divmod(index, cols)
+    if 0 < row < rows - 1 and 0 < col < cols - 1:
+        above, below = index - cols, index + cols
+        return (above - 1, above, above + 1, index - 1, index + 1, below - 1, below, below + 1)
+    return tuple(r * cols + c
+                 for r in range(max(row - 1, 0), min(row + 2, rows))
+                 for c in range(max(col - 1, 0), min(col + 2, cols))
+                 if r != row or c != col)
+
+
+def neighbor_coords(rows, cols, index):
+    """ Return the coordinates of the squares around index that are on the board."""
+    return tuple(divmod(j, cols) for j in neighbor_indexes(rows, cols, index))
+
+
+def topology(rows, cols):
+    """
+        Return the Topology of a rows x cols board, shared by every board of that shape.
+        Boards of up to TABLE_CELLS squares get tables built once; larger ones compute each
+        entry on access, since their tables would cost hundreds of bytes per square. The last
+        TOPOLOGY_CACHE shapes asked for are kept.
+    """
+    key = (rows, cols)
+    if key in TOPOLOGIES:
+        TOPOLOGIES.move_to_end(key)
+        return TOPOLOGIES[key]
+    cells = rows * cols
+    if cells <= TABLE_CELLS:
+        coords = tuple(divmod(i, cols) for i in range(cells))
+        neighbors = tuple(neighbor_indexes(rows, cols, i) for i in range(cells))
+        result = Topology(neighbors, tuple(tuple(coords[j] for j in around) for around in neighbors), coords)
+    else:
+        result = Topology(Computed(partial(neighbor_indexes, rows, cols)),
+                          Computed(partial(neighbor_coords, rows, cols)),
+                          Computed(lambda index: divmod(index, cols)))
+    TOPOLOGIES[key] = result
+    if len(TOPOLOGIES) > TOPOLOGY_CACHE:
+        TOPOLOGIES.popitem(last=False)
+    return result
+
+
+BIT_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+DIGIT_BITS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def pack_bits(values):
+    """ Return an int with bit i set for every true value at position i (bytes must hold 0s and 1s)."""
+    if isinstance(values, (bytes, bytearray)):
+        return int(bytes(values).translate(BIT_DIGITS)[::-1] or b"0", 2)
+    return int("".join("1" if value else "0" for value in values)[::-1] or "0", 2)
+
 
-def get_random(row, col):
-    a = random.randint(0, row - 1)
-    b = random.randint(0, col - 1)
-    return a, b
+def unpack_flags(bitmap, length):
+    """ Return the first length bits of bitmap as a bytearray of 0s and 1s, lowest bit first."""
+    return bytearray(format(bitmap, "0%db" % length)[::-1].encode().translate(DIGIT_BITS))
@@ -0,0 +1,198 @@
+import time
+from collections import Counter
+
+import gameplay
+
+"""
+    Opt-in instrumentation for the board and the solver.
+
+    enable(stats, Round) wraps the hot methods of Board, Square and the given Round class so
+    that every call is counted or timed into stats; disable() puts the original methods back.
+    Nothing is wrapped unless instrumentation is enabled, so normal runs pay nothing for it.
+"""
+
+COUNTED = [
+    (gameplay.Board, "get_neighboring_squares"),
+    (gameplay.Board, "get_neighbor_coords"),
+    (gameplay.Square, "mine_neighbors"),
+]
+TIMED = ["choose_bestnext", "choose_exactnext"]
+
+originals = {}
+
+
+class Histogram:
+    """
+        Counts values in power-of-two buckets, along with their total, minimum and maximum.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.low = None
+        self.high = None
+        self.buckets = Counter()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.low = value if self.low is None else min(self.low, value)
+        self.high = value if self.high is None else max(self.high, value)
+        self.buckets[int(value).bit_length()] += 1
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.low = other.low if self.low is None else min(self.low, other.low)
+        self.high = other.high if self.high is None else max(self.high, other.high)
+        self.buckets.update(other.buckets)
+
+    def as_dict(self):
+        return {"count": self.count, "total": self.total, "low": self.low, "high": self.high,
+                "buckets": {str(bucket): n for bucket, n in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.low = data["low"]
+        histogram.high = data["high"]
+        histogram.buckets = Counter({int(bucket): n for bucket, n in data["buckets"].items()})
+        return histogram
+
+    def lines(self, width=40):
+        """ Return one text bar per bucket, labelled with the bucket's value range."""
+        most = max(self.buckets.values())
+        lines = []
+        for bucket in sorted(self.buckets):
+            low = 0 if bucket == 0 else 1 << (bucket - 1)
+            high = (1 << bucket) - 1
+            bar = "#" * max(1, self.buckets[bucket] * width // most)
+            lines.append("    %9d - %-9d %9d  %s" % (low, high, self.buckets[bucket], bar))
+        return lines
+
+
+class Stats:
+    """
+        Call counters and histograms collected while instrumentation is enabled.
+        Timings are stored in microseconds. Stats from different workers are combined with merge.
+    """
+
+    def __init__(self):
+        self.counters = Counter()
+        self.histograms = {}
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def observe(self, name, value):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+        self.histograms[name].add(value)
+
+    def merge(self, other):
+        self.counters.update(other.counters)
+        for name, histogram in other.histograms.items():
+            if name not in self.histograms:
+                self.histograms[name] = Histogram()
+            self.histograms[name].merge(histogram)
+
+    def as_dict(self):
+        return {"counters": dict(self.counters),
+                "histograms": {name: histogram.as_dict() for name, histogram in self.histograms.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.counters = Counter(data["counters"])
+        stats.histograms = {name: Histogram.from_dict(histogram) for name, histogram in data["histograms"].items()}
+        return stats
+
+    def summary(self):
+        """ Return the counters and histograms as printable text."""
+        lines = ["\nInstrumentation summary:"]
+        for name in sorted(self.counters):
+            lines.append("  %-28s %12d calls" % (name, self.counters[name]))
+        for name in sorted(self.histograms):
+            histogram = self.histograms[name]
+            lines.append("\n  %s: %d samples, mean %.1f, min %s, max %s" % (
+                name, histogram.count, histogram.total / histogram.count, histogram.low, histogram.high))
+            lines.extend(histogram.lines())
+        return "\n".join(lines)
+
+
+def enable(stats, round_class):
+    """
+        Starts recording into stats by wrapping the instrumented methods.
+        round_class is the solver's Round, passed in so this module does not import msweep.
+    """
+    disable()
+    for cls, name in COUNTED:
+        wrap(cls, name, counted(stats, cls.__name__ + "." + name, getattr(cls, name)))
+    for name in TIMED:
+        wrap(round_class, name, timed(stats, name + "_us", getattr(round_class, name)))
+    wrap(gameplay.Board, "click", timed_click(stats, gameplay.Board.click))
+    wrap(gameplay.Board, "play_moves", timed_moves(stats, gameplay.Board.play_moves))
+    wrap(round_class, "play", counted_moves(stats, round_class.play))
+
+
+def disable():
+    """
+        Puts back every method wrapped by enable.
+    """
+    for (cls, name), method in originals.items():
+        setattr(cls, name, method)
+    originals.clear()
+
+
+def wrap(cls, name, wrapper):
+    originals[(cls, name)] = getattr(cls, name)
+    setattr(cls, name, wrapper)
+
+
+def counted(stats, key, method):
+    def wrapper(*args, **kwargs):
+        stats.counters[key] += 1
+        return method(*args, **kwargs)
+    return wrapper
+
+
+def timed(stats, key, method):
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        result = method(*args, **kwargs)
+        stats.observe(key, int((time.perf_counter() - t0) * 1e6))
+        return result
+    return wrapper
+
+
+def timed_click(stats, method):
+    def wrapper(board, row, col):
+        t0 = time.perf_counter()
+        revealed = method(board, row, col)
+        stats.observe("click_us", int((time.perf_counter() - t0) * 1e6))
+        stats.observe("flood_fill_size", len(revealed))
+        return revealed
+    return wrapper
+
+
+def timed_moves(stats, method):
+    def wrapper(board, clicks=(), flags=(), chords=()):
+        t0 = time.perf_counter()
+        revealed = method(board, clicks, flags, chords)
+        stats.observe("play_moves_us", int((time.perf_counter() - t0) * 1e6))
+        stats.observe("clicks_per_batch", len(clicks))
+        stats.observe("flood_fill_size", len(revealed))
+        return revealed
+    return wrapper
+
+
+def counted_moves(stats, method):
+    def wrapper(current_round):
+        result = method(current_round)
+        stats.observe("moves_per_game", current_round.moves)
+        return result
+    return wrapper
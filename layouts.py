@@ -0,0 +1,128 @@
+import os
+import sys
+import struct
+import argparse
+
+import numpy as np
+
+from batchsim import random_layouts
+from gameplay import Board, GameState, Snapshot
+
+"""
+    Files of pre-generated mine layouts, so solver runs spend their time solving and different
+    solver versions can be compared on exactly the same boards.
+
+    python3 layouts.py layouts.bin --games 1000000 --rows 16 --cols 16 --mines 40
+    Solver(max_games=1000000, layouts="layouts.bin").autoplay()
+
+    The file starts with a fixed header giving the board size, the number of mines and games
+    and the seed, followed by one bitmap per game with bit row * cols + col set for every mine
+    (the same bitmap as gamefile). Layouts are sampled in vectorized batches, each batch with
+    its own child of the seed's numpy SeedSequence, and the file is read through a read-only
+    memory map, so the pages are shared by every worker process reading it. A worker keeps one
+    Board per file and resets it to each layout with Board.restore instead of building a new one.
+"""
+
+MAGIC = b"MSLY"
+HEADER = struct.Struct("<4sHIIIIq")
+HEADER_SIZE = 32
+OPEN = {}
+
+
+class LayoutFile:
+    """
+        A layout file opened for reading. Layout i is the board for game seed i.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, rows, cols, mines, games, seed = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != 1:
+            raise ValueError('Not a mine layout file.')
+        self.path = path
+        self.rows = rows
+        self.cols = cols
+        self.number_of_mines = mines
+        self.games = games
+        self.seed = seed
+        self.bitmap_size = (rows * cols + 7) // 8
+        if os.path.getsize(path) != HEADER_SIZE + games * self.bitmap_size:
+            raise ValueError('Truncated mine layout file.')
+        self.bitmaps = np.memmap(path, dtype=np.uint8, mode="r", offset=HEADER_SIZE,
+                                 shape=(games, self.bitmap_size))
+        self.reused = None
+
+    def __len__(self):
+        return self.games
+
+    def check(self, index):
+        if not 0 <= index < self.games:
+            raise IndexError('No layout %d in %s.' % (index, self.path))
+
+    def mines(self, index):
+        """ Return the mine coordinates of layout index."""
+        self.check(index)
+        cells = np.unpackbits(self.bitmaps[index], count=self.rows * self.cols, bitorder="little")
+        return [divmod(int(cell), self.cols) for cell in np.flatnonzero(cells)]
+
+    def board(self, index):
+        """
+            Return a new game on layout index. The same Board is handed out by every call, reset
+            from the bitmap, so a game must be finished before the next one is asked for.
+            Its generator is reseeded from the file's seed and index, so strategies that draw from
+            board.random play layout index the same way in every run.
+        """
+        self.check(index)
+        if self.reused is None:
+            self.reused = Board(self.rows, self.cols, number_of_mines=0)
+            self.reused.number_of_mines = self.number_of_mines
+        bitmap = int.from_bytes(self.bitmaps[index].tobytes(), "little")
+        self.reused.restore(Snapshot(bitmap, 0, 0, GameState.START, 0))
+        self.reused.random.seed("%d:%d" % (self.seed, index))
+        return self.reused
+
+
+def open_layouts(path):
+    """ Return the LayoutFile for path, opening it once per process."""
+    if path not in OPEN:
+        OPEN[path] = LayoutFile(path)
+    return OPEN[path]
+
+
+def generate(path, games, rows, cols, number_of_mines, seed=0, batch_size=10000):
+    """
+        Writes games layouts of number_of_mines mines on rows x cols boards to path, sampled in
+        batches of batch_size and written straight into a memory map of the file.
+    """
+    bitmap_size = (rows * cols + 7) // 8
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, 1, rows, cols, number_of_mines, games, seed).ljust(HEADER_SIZE, b"\0"))
+        f.truncate(HEADER_SIZE + games * bitmap_size)
+    if not games:
+        return
+    bitmaps = np.memmap(path, dtype=np.uint8, mode="r+", offset=HEADER_SIZE, shape=(games, bitmap_size))
+    batches = np.random.SeedSequence(seed).spawn((games + batch_size - 1) // batch_size)
+    for i, batch_seed in enumerate(batches):
+        start = i * batch_size
+        size = min(batch_size, games - start)
+        mines = random_layouts(np.random.default_rng(batch_seed), size, rows, cols, number_of_mines)
+        bitmaps[start:start + size] = np.packbits(mines.reshape(size, -1), axis=1, bitorder="little")
+    bitmaps.flush()
+    del bitmaps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate mine layouts for solver runs.")
+    parser.add_argument("path")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--mines", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.path, args.games, args.rows, args.cols, args.mines, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,130 +1,514 @@
 import sys
 import os
 import time
-import random
-
+import cProfile
+from collections import namedtuple
+
+import instrument
+from checkpoint import Checkpoint
+from instrument import Stats
+from results import GameRecord, Progress, open_sink, wilson_interval
+from gamefile import GameFormat, GameWriter
 from gameplay import Board, GameState
-from multiprocessing import Pool, Value, Process
+from probability import MineProbabilities
+from patterns import PatternCache, relevant, wall_table, window
+from multiprocessing import Pool
 
 """ 
     Command Line / Terminal Version of Minesweeper
     - Created by Angelica Quach
 """
 
+ChunkResult = namedtuple("ChunkResult", ["seeds", "records", "stats", "games"])
+
+# Largest chunk of games an adaptive run hands a worker, so the stop test runs often.
+ADAPTIVE_CHUNK = 25
+
+
 class Solver:
     """
     Plays a changable amount of games, keeping track of time and games won.
+    Games are split into chunks of consecutive seeds and played on a long-lived
+    process pool; each worker tallies its chunk locally and the totals are combined here.
+
+    With instrument=True every chunk records call counts, timings, game sizes and the hits and
+    misses of the Round pattern cache with instrument.Stats, and the merged summary is printed
+    at the end of autoplay.
+    With profile set to a path, the chunk holding the first seed runs under cProfile and
+    its profile is written to that path.
+
+    Every game produces a results.GameRecord. With records set to a path, records are appended
+    to it (CSV for .csv, JSON lines otherwise) as each chunk finishes, and with progress set to
+    a number of seconds a progress line with throughput is printed at most that often.
+    With game_file set to a path, every game's mines and moves are appended to it in the
+    binary format of gamefile, so failed games can be replayed later with gamefile.GameReader.
+
+    With checkpoint set to a path, progress is saved there before the first game, at most every
+    checkpoint_interval seconds and at the end; running the same Solver again resumes from it,
+    skipping the seed ranges already played.
+
+    Games are played on rows x cols boards with mines mines.
+    With layouts set to a file written by layouts.generate, game seed i is played on the file's
+    layout i instead of a board drawn from the seed, so runs can be compared on identical boards;
+    the board size and mines are then taken from the file.
+
+    With target_width set, autoplay stops as soon as the 95% Wilson interval on the win rate is
+    at most that wide, and with time_budget set, once that many seconds have passed; max_games
+    stays the upper limit. Such adaptive runs hand out chunks of at most ADAPTIVE_CHUNK games
+    and take results in seed order, so the decision is prompt and the games counted are always
+    the first seeds, not whichever finished first. stop_reason says why the run ended early.
     """
 
-    def __init__(self):
-        self.game_count = Value('i', 0)
-        self.win_count = Value('i', 0)
-        self.max_games = 100000
+    def __init__(self, max_games=100000, workers=None, chunk_size=250, seed=0, strategy="best",
+                 instrument=False, profile=None, records=None, progress=None, game_file=None,
+                 checkpoint=None, checkpoint_interval=60, layouts=None, rows=10, cols=10, mines=10,
+                 target_width=None, time_budget=None):
+        self.game_count = 0
+        self.win_count = 0
+        self.max_games = max_games
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.strategy = strategy
+        self.instrument = instrument
+        self.profile = profile
+        self.stats = Stats() if instrument else None
+        self.records = records
+        self.progress = progress
+        self.game_file = game_file
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.layouts = layouts
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.target_width = target_width
+        self.time_budget = time_budget
+        self.stop_reason = None
+        if layouts:
+            from layouts import open_layouts
+            layout_file = open_layouts(layouts)
+            self.rows, self.cols, self.mines = layout_file.rows, layout_file.cols, layout_file.number_of_mines
 
     def autoplay(self):
         t0 = time.time()
-        while self.game_count.value < self.max_games:
-            processes = []
-            for _ in range(16):
-                p = Process(target=self.play_round)
-                processes.append(p)
-                p.start()
-            for p in processes:
-                p.join()
+        self.stop_reason = None
+        wall_table()
+        if self.layouts:
+            from layouts import open_layouts
+            if self.seed < 0 or self.seed + self.max_games > len(open_layouts(self.layouts)):
+                raise ValueError('Layout file has too few games for these seeds.')
+        state = self.resume() if self.checkpoint else None
+        if state:
+            self.save(state)
+        chunks = [seeds for seeds in self.seed_chunks() if not (state and state.is_done(seeds))]
+        sink = open_sink(self.records) if self.records else None
+        progress = Progress(self.max_games, self.progress, done=self.game_count) if self.progress else None
+        writer = GameWriter(self.game_file, self.rows, self.cols) if self.game_file else None
+        saved = time.time()
+        try:
+            with Pool(self.workers) as pool:
+                results = pool.imap(self.play_chunk, chunks) if self.adaptive() else pool.imap_unordered(self.play_chunk, chunks)
+                for result in results:
+                    self.game_count += len(result.records)
+                    self.win_count += sum(1 for record in result.records if record.result == GameState.WIN.name)
+                    if result.stats:
+                        self.stats.merge(result.stats)
+                    if sink:
+                        sink.write(result.records)
+                    if writer:
+                        writer.write(result.games)
+                    if progress:
+                        progress.update(self.game_count, self.win_count)
+                    if state:
+                        state.mark_done(result.seeds)
+                        if time.time() - saved >= self.checkpoint_interval:
+                            self.save(state)
+                            saved = time.time()
+                    if self.adaptive() and self.should_stop(t0):
+                        break
+        finally:
+            if sink:
+                sink.close()
+            if writer:
+                writer.close()
+        if state:
+            self.save(state)
+        if progress:
+            progress.update(self.game_count, self.win_count, force=True)
         t1 = time.time()
         minutes = int((t1-t0) / 60)
         seconds = int((t1-t0) % 60)
-        print("\nNumber of games won: " + str(self.win_count.value) + " out of " + str(self.game_count.value) + " games.")
-        print("Total time to complete the " + str(self.game_count.value) + " attempts: " + str(minutes) + " minutes and " + str(seconds) + " seconds!")
-        print("Average win rate: " + str(int(((self.win_count.value / self.game_count.value) * 100))) + "%\n")
+        print("\nNumber of games won: " + str(self.win_count) + " out of " + str(self.game_count) + " games.")
+        print("Total time to complete the " + str(self.game_count) + " attempts: " + str(minutes) + " minutes and " + str(seconds) + " seconds!")
+        print("Average win rate: " + str(int(((self.win_count / self.game_count) * 100))) + "%\n")
+        if self.adaptive():
+            low, high = wilson_interval(self.win_count, self.game_count)
+            print("95%% interval: %.1f%% to %.1f%%" % (100 * low, 100 * high))
+            if self.stop_reason:
+                print("Stopped early: " + self.stop_reason + "\n")
+        if self.stats:
+            print(self.stats.summary())
+
+    def adaptive(self):
+        return self.target_width is not None or self.time_budget is not None
+
+    def should_stop(self, start):
+        """
+        Returns True, setting stop_reason, once the win rate interval is narrow enough or the
+        time budget since start is spent.
+        """
+        low, high = wilson_interval(self.win_count, self.game_count)
+        if self.target_width is not None and high - low <= self.target_width:
+            self.stop_reason = "interval %.4f is within the target width %.4f" % (high - low, self.target_width)
+        elif self.time_budget is not None and time.time() - start >= self.time_budget:
+            self.stop_reason = "time budget of %gs spent" % self.time_budget
+        return self.stop_reason is not None
+
+    def resume(self):
+        """
+        Loads the checkpoint, restoring the tallies and cutting the output files back to
+        where they were when it was saved. Returns the Checkpoint.
+        """
+        config = {"max_games": self.max_games, "chunk_size": self.chunk_size,
+                  "seed": self.seed, "strategy": self.strategy,
+                  "rows": self.rows, "cols": self.cols, "mines": self.mines}
+        if self.layouts:
+            config["layouts"] = os.path.abspath(self.layouts)
+        state = Checkpoint.load(self.checkpoint, config)
+        self.game_count = state.game_count
+        self.win_count = state.win_count
+        if self.stats and state.stats:
+            self.stats = state.stats
+        for path in (self.records, self.game_file):
+            if path:
+                state.restore_file(path)
+        return state
+
+    def save(self, state):
+        state.game_count = self.game_count
+        state.win_count = self.win_count
+        state.stats = self.stats
+        for path in (self.records, self.game_file):
+            if path:
+                state.record_file(path)
+        state.save()
+
+    def __getstate__(self):
+        """
+        Leaves the parent's running totals out of the copy sent to workers with every chunk.
+        """
+        state = self.__dict__.copy()
+        state["stats"] = None
+        return state
+
+    def seed_chunks(self):
+        """
+        Splits the run into ranges of game seeds, chunk_size games each (at most ADAPTIVE_CHUNK
+        in adaptive runs).
+        """
+        end = self.seed + self.max_games
+        size = min(self.chunk_size, ADAPTIVE_CHUNK) if self.adaptive() else self.chunk_size
+        for start in range(self.seed, end, size):
+            yield range(start, min(start + size, end))
 
-    def play_round(self):
-        board = Board(rows=10, cols=10)
-        current_round = Round(board)
-        if current_round.play() == GameState.WIN:
-            self.win_count.value += 1
-        self.game_count.value += 1
+    def play_chunk(self, seeds):
+        """
+        Plays one game per seed inside a worker and returns a ChunkResult: the seeds, their
+        records, stats (None unless the solver is instrumented) and the packed games
+        (None unless a game file is written).
+        """
+        stats = None
+        if self.instrument:
+            stats = Stats()
+            instrument.enable(stats, Round)
+        hits, misses, table_hits = Round.patterns.hits, Round.patterns.misses, Round.patterns.table_hits
+        profiler = None
+        if self.profile and seeds.start == self.seed:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        records = []
+        games = [] if self.game_file else None
+        try:
+            for seed in seeds:
+                records.append(self.play_round(seed, games))
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(self.profile)
+            if stats:
+                instrument.disable()
+                stats.count("PatternCache.hits", Round.patterns.hits - hits)
+                stats.count("PatternCache.misses", Round.patterns.misses - misses)
+                stats.count("PatternCache.table_hits", Round.patterns.table_hits - table_hits)
+        return ChunkResult(seeds, records, stats, games)
+
+    def play_round(self, seed=None, games=None):
+        """
+        Plays one game and returns its GameRecord. If games is a list, the packed game is appended to it.
+        """
+        t0 = time.perf_counter()
+        if self.layouts:
+            from layouts import open_layouts
+            layout_file = open_layouts(self.layouts)
+            board = layout_file.board(seed)
+            mines = layout_file.mines(seed) if games is not None else None
+        else:
+            board = Board(rows=self.rows, cols=self.cols, number_of_mines=self.mines, seed=seed)
+            mines = list(board.mines_coords)
+        current_round = Round(board, strategy=self.strategy)
+        result = current_round.play()
+        if games is not None:
+            games.append(GameFormat(board.rows, board.cols).pack(seed, result, mines, current_round.history))
+        return GameRecord(seed, board.rows, board.cols, board.number_of_mines, result.name,
+                          current_round.moves, current_round.guesses, time.perf_counter() - t0)
 
 
 class Round:
+    """
+    Plays one game on a board, keeping the frontier up to date as squares are revealed.
+
+    interior holds the unknown squares with no revealed number next to them, and frontier
+    the unknown squares that touch at least one. For every revealed number the round keeps
+    how many of its neighbors are still unknown and how many are flagged, and only the
+    frontier squares around numbers whose counts changed (dirty) get their estimate redone.
+
+    strategy picks the move selection: "best" decides each square from the 5x5 window of
+    numbers around it, "exact" computes exact mine probabilities with probability.MineProbabilities,
+    and "random" clicks unknown squares at random. With first_click set, the first move is that
+    square whatever the strategy, so strategies can be compared on the same opening.
+    Window deductions are kept in patterns, a PatternCache shared by every round in the process,
+    and both strategies first look windows up in the precomputed pattern table.
+
+    A board too large to list, such as a chunkboard.ChunkBoard, supplies its own interior
+    through unopened(), which only stores the squares taken out of it.
+    """
+
+    STRATEGIES = {"best": "choose_bestnext", "exact": "choose_exactnext", "random": "choose_next"}
+    patterns = PatternCache()
 
-    def __init__(self, board):
+    def __init__(self, board, strategy="best", first_click=None):
         self.board = board
-        self.possible_squares = set()
-        self.make_squares()
+        self.first_click = first_click
+        self.choose = getattr(self, self.STRATEGIES[strategy])
+        self.probabilities = MineProbabilities()
+        self.table = wall_table()
+        self.safe = []
+        self.moves = 0
+        self.guesses = 0
+        self.history = []
+        self.rows, self.cols = board.get_dimensions()
         self.found_mines = 0
+        self.interior = set()
+        self.frontier = set()
+        self.unknown_counts = {}
+        self.flag_counts = {}
+        self.estimates = {}
+        self.dirty = set()
+        self.make_squares()
 
     def make_squares(self):
-        for r in range(10):
-            for c in range(10):
-                self.possible_squares.add(self.board.get_square(r, c))
+        if hasattr(self.board, "unopened"):
+            self.interior = self.board.unopened()
+            return
+        for r in range(self.rows):
+            for c in range(self.cols):
+                self.interior.add((r, c))
+
+    def is_unknown(self, cell):
+        return cell in self.frontier or cell in self.interior
 
-    def choose_next(self, round):
+    def reveal(self, revealed):
         """
-        Old random selection strategy.
+        Updates the frontier and number counts from the squares a click revealed.
         """
-        return random.choice(self.possible_squares)
+        for cell in revealed:
+            self.interior.discard(cell)
+            self.frontier.discard(cell)
+            self.estimates.pop(cell, None)
+            neighbors = self.board.get_neighbor_coords(cell[0], cell[1])
+            for neighbor in neighbors:
+                if neighbor in self.unknown_counts:
+                    self.unknown_counts[neighbor] -= 1
+                    self.mark_dirty(neighbor)
+            number = self.board.get_square(cell[0], cell[1]).mine_neighbors()
+            if number == 0:
+                continue
+            unknown = 0
+            flagged = 0
+            for neighbor in neighbors:
+                if self.is_unknown(neighbor):
+                    unknown += 1
+                    if neighbor in self.interior:
+                        self.interior.remove(neighbor)
+                        self.frontier.add(neighbor)
+                    self.dirty.add(neighbor)
+                elif self.board.get_square(neighbor[0], neighbor[1]).flagged:
+                    flagged += 1
+            self.unknown_counts[cell] = unknown
+            self.flag_counts[cell] = flagged
+
+    def flag(self, cell):
+        """
+        Flags a square the round has proven to be a mine and updates the numbers around it.
+        """
+        self.frontier.discard(cell)
+        self.interior.discard(cell)
+        self.estimates.pop(cell, None)
+        self.board.get_square(cell[0], cell[1]).flag_square()
+        self.history.append((cell[0], cell[1], 1))
+        self.found_mines += 1
+        for neighbor in self.board.get_neighbor_coords(cell[0], cell[1]):
+            if neighbor in self.unknown_counts:
+                self.unknown_counts[neighbor] -= 1
+                self.flag_counts[neighbor] += 1
+                self.mark_dirty(neighbor)
+
+    def mark_dirty(self, number_cell):
+        for neighbor in self.board.get_neighbor_coords(number_cell[0], number_cell[1]):
+            if neighbor in self.frontier:
+                self.dirty.add(neighbor)
+
+    def choose_next(self):
+        """
+        Old random selection strategy: clicks any unknown square, drawn from the board's generator.
+        Every pick is a guess. On a bounded board squares are drawn until one is unknown, which
+        takes cells / unknown draws on average instead of gathering and sorting every unknown square.
+        """
+        self.guesses += 1
+        random = self.board.random
+        if self.rows is not None and self.cols is not None:
+            while True:
+                cell = (random.randrange(self.rows), random.randrange(self.cols))
+                if self.is_unknown(cell):
+                    return cell
+        if random.randrange(len(self.frontier) + len(self.interior)) < len(self.frontier):
+            return random.choice(sorted(self.frontier))
+        return next(iter(self.interior))
 
     def choose_bestnext(self):
         """
         New optimal selection strategy.
         """
-        lowest_percent = 100
-        best_choice = None
-        remove_squares = set()
-
-        for iSq in self.possible_squares:
-            if self.board.is_unknown(iSq):
-                percentages = []
-                neighbors = self.board.get_neighboring_squares(iSq)
-
-                for jSq in neighbors:
-                    if jSq.as_int():
-                        count_x = 0
-                        count_f = 0
-                        check = self.board.get_neighboring_squares(jSq)
-                        for kSq in check:
-                            if self.board.is_unknown(kSq):
-                                count_x += 1
-                            elif kSq.flagged:
-                                count_f += 1
-
-                        if count_x != 0:
-                            percentages.append((jSq.as_int() - count_f) / count_x)
-
-                if len(percentages) == 0:
-                    avg_percent = (10 - self.found_mines) / len(self.possible_squares)
-                elif percentages.count(1) != 0:
-                    avg_percent = 1
-                    iSq.flag_square()
-                    self.found_mines += 1
-                    remove_squares.add(iSq)
-                else:
-                    sum_so_far = 0
-                    for p in percentages:
-                        sum_so_far += p
-                    avg_percent = sum_so_far / len(percentages)
-
-                if avg_percent < lowest_percent:
-                    lowest_percent = avg_percent
-                    best_choice = iSq
+        while self.dirty:
+            cell = self.dirty.pop()
+            if cell not in self.frontier:
+                continue
+            mine, percent = self.patterns.deduce(self, cell, self.table)
+            if mine:
+                self.flag(cell)
+            else:
+                self.estimates[cell] = percent
 
+        best_choice = None
+        lowest_percent = 100
+        if self.estimates:
+            best_choice = min(self.estimates, key=lambda cell: (self.estimates[cell], cell))
+            lowest_percent = self.estimates[best_choice]
+        if self.interior:
+            unknown = len(self.interior) + len(self.frontier)
+            interior_percent = (self.board.mine_count - self.found_mines) / unknown
+            if interior_percent < lowest_percent:
+                best_choice = next(iter(self.interior))
+                lowest_percent = interior_percent
+        if lowest_percent > 0:
+            self.guesses += 1
+
+        return best_choice if best_choice else (0, 0)
+
+    def choose_exactnext(self):
+        """
+        Exact selection strategy: flags every square that is a mine in all consistent layouts,
+        opens squares that are safe in all of them, and otherwise picks the lowest probability.
+        """
+        while self.safe:
+            cell = self.safe.pop()
+            if self.is_unknown(cell):
+                return cell
+        self.table_moves()
+        while self.safe:
+            cell = self.safe.pop()
+            if self.is_unknown(cell):
+                return cell
+
+        constraints = []
+        for cell, unknown in self.unknown_counts.items():
+            if unknown:
+                squares = tuple(neighbor for neighbor in self.board.get_neighbor_coords(cell[0], cell[1])
+                                if neighbor in self.frontier)
+                mines = self.board.get_square(cell[0], cell[1]).mine_neighbors() - self.flag_counts[cell]
+                constraints.append((squares, mines))
+        mines_left = self.board.mine_count - self.found_mines
+        probabilities, interior_percent, certain = self.probabilities.solve(constraints, len(self.interior), mines_left)
+
+        for cell, mine in certain.items():
+            if mine:
+                self.flag(cell)
             else:
-                remove_squares.add(iSq)
+                self.safe.append(cell)
+        self.dirty.clear()
+        if self.safe:
+            return self.safe.pop()
 
-        best_coords = best_choice.get_coords() if best_choice else (0, 0)
+        best_choice = None
+        lowest_percent = 100
+        uncertain = [cell for cell in probabilities if cell not in certain]
+        if uncertain:
+            best_choice = min(uncertain, key=lambda cell: (probabilities[cell], cell))
+            lowest_percent = probabilities[best_choice]
+        if self.interior and interior_percent < lowest_percent:
+            best_choice = next(iter(self.interior))
+        self.guesses += 1
 
-        remove_squares.add(best_choice)
-        self.possible_squares = self.possible_squares.difference(remove_squares)
+        return best_choice if best_choice else (0, 0)
 
-        return best_coords
+    def table_moves(self):
+        """
+        Flags the dirty frontier squares that the pattern table proves to be mines, until it
+        finds one that the table proves safe and queues it.
+        """
+        while self.dirty:
+            cell = self.dirty.pop()
+            if cell not in self.frontier:
+                continue
+            mine = self.table.get(relevant(window(self, cell)))
+            if mine is None:
+                continue
+            self.patterns.table_hits += 1
+            if mine:
+                self.flag(cell)
+            else:
+                self.safe.append(cell)
+                return
 
     def play(self):
         while self.board.game_state in [GameState.ONGOING, GameState.START]:
-            guess = self.choose_bestnext()
-            self.board.click(guess[0], guess[1])
+            guess = self.first_click if self.first_click and not self.moves else self.choose()
+            if self.board.game_state not in [GameState.ONGOING, GameState.START]:
+                break
+            clicks = [guess] + self.known_safe(guess)
+            self.moves += len(clicks)
+            self.history.extend((row, col, 0) for row, col in clicks)
+            if len(clicks) > 1 and hasattr(self.board, "play_moves"):
+                self.reveal(self.board.play_moves(clicks=clicks))
+            else:
+                for row, col in clicks:
+                    self.reveal(self.board.click(row, col))
         return self.board.game_state
 
+    def known_safe(self, guess):
+        """
+        Takes every square besides guess that the strategy has already proven safe, queued in
+        safe or estimated at 0, so play can open them together with guess.
+        """
+        cells = [cell for cell in set(self.safe) if cell != guess and self.is_unknown(cell)]
+        self.safe.clear()
+        for cell, percent in list(self.estimates.items()):
+            if percent == 0 and cell != guess:
+                cells.append(cell)
+                del self.estimates[cell]
+        return cells
+
 def intro():
     print("\n\n ~~~ Welcome to Minesweeper in Terminal! ~~~")
     print("\n\nIf you would like to play, please enter 'p' or 'play'.")
@@ -201,14 +585,7 @@ def play():
     while board.game_state in [GameState.ONGOING, GameState.START]:
         board.print_board(board.print_square)
         try:
-            inp = input("> ")
-            line = "".join(inp.split())
-            if line[0] == "f":
-                point = list(map(int, line[1:].split(",")))
-                board.get_square(point[0], point[1]).flag_square()
-            else:
-                point = list(map(int, line.split(",")))
-                board.click(point[0], point[1])
+            apply_move(board, input("> "))
         except (IndexError, ValueError):
             oops()
             instructions()
@@ -225,6 +602,22 @@ def play():
     board.print_board(board.print_solution)
 
 
+def apply_move(board, inp):
+    """
+    Plays one "<row>, <column>" click or "f <row>, <column>" flag on the board.
+    Returns the squares the move revealed; raises IndexError or ValueError for bad input.
+    """
+    line = "".join(inp.split())
+    flag = line[0] == "f"
+    point = list(map(int, (line[1:] if flag else line).split(",")))
+    if len(point) != 2 or not board.is_valid_square(point[0], point[1]):
+        raise IndexError('Not on the board.')
+    if flag:
+        board.get_square(point[0], point[1]).flag_square()
+        return []
+    return board.click(point[0], point[1])
+
+
 def play_again():
     ask = input('Would you like to go again? (y/n): ')
     return ask.lower() == 'y'
@@ -0,0 +1,255 @@
+import os
+import json
+import itertools
+from collections import OrderedDict
+
+from probability import split_components, count_component
+
+"""
+    Local-pattern deductions for the solver, cached across moves and games.
+
+    The fate of a frontier square only depends on the revealed numbers around it, and those
+    numbers only see the 5x5 window centred on the square. The window is encoded as a string:
+    '?' for an unknown square, a digit for a number in the inner 3x3 (its mines still
+    unflagged), and '.' for anything else (off the board, flagged, or revealed in the outer
+    ring). The shared key writes unknown squares next to none of those numbers as '.' too,
+    since they cannot matter, and is the smallest encoding over the 8 rotations and
+    reflections; those all keep the centre in place, so the deduction for the centre holds
+    for every orientation.
+
+    The pattern table is built once by solving every window whose unknown squares form a
+    straight run through the centre, the edge patterns such as 1-1 and 1-2-1, and keeps the
+    ones that prove the centre. It is saved to pattern_table.json (python3 patterns.py
+    rebuilds it) and looked up before any counting is done.
+"""
+
+SIZE = 5
+CENTRE = SIZE * SIZE // 2
+
+
+def symmetries():
+    """ Return the 8 rotations and reflections of the window as index permutations."""
+    transforms = []
+    for flip in (False, True):
+        for turns in range(4):
+            permutation = []
+            for i in range(SIZE * SIZE):
+                r, c = divmod(i, SIZE)
+                if flip:
+                    c = SIZE - 1 - c
+                for _ in range(turns):
+                    r, c = c, SIZE - 1 - r
+                permutation.append(r * SIZE + c)
+            transforms.append(permutation)
+    return transforms
+
+
+SYMMETRIES = symmetries()
+
+# Numbers either side of the centre row, for the line windows of the pattern table.
+LINE_NUMBERS = [6, 7, 8, 16, 17, 18]
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pattern_table.json")
+TABLE = None
+
+# For every window position, the inner 3x3 positions next to it (where its numbers can be).
+INNER = [r * SIZE + c for r in range(1, 4) for c in range(1, 4) if r * SIZE + c != CENTRE]
+NEAR_INNER = [frozenset(j for j in INNER if i != j and abs(i // SIZE - j // SIZE) <= 1 and abs(i % SIZE - j % SIZE) <= 1)
+              for i in range(SIZE * SIZE)]
+DIGITS = frozenset("012345678")
+
+
+class PatternCache:
+    """
+        Least-recently-used cache from canonical window keys to (mine, probability) for the
+        centre square: mine is True or False when the window proves it, None otherwise, and
+        probability is the share of the window's consistent layouts with a mine in the centre.
+        Holds at most size patterns and counts hits and misses, and how many windows the
+        pattern table decided.
+    """
+
+    def __init__(self, size=100000):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.table_hits = 0
+
+    def deduce(self, current_round, cell, table=None):
+        """
+            Return (mine, probability) for a frontier square of current_round.
+            Windows are also stored as seen, so a repeat in the same orientation skips
+            the canonical key. A window found in table is decided without solving it.
+        """
+        key = window(current_round, cell)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        relevant_key = relevant(key)
+        if table and relevant_key in table:
+            self.table_hits += 1
+            result = table[relevant_key], float(table[relevant_key])
+            self.store(key, result)
+            return result
+        canonical_key = canonical(relevant_key)
+        if canonical_key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(canonical_key)
+            result = self.entries[canonical_key]
+        else:
+            self.misses += 1
+            result = solve_window(canonical_key)
+            self.store(canonical_key, result)
+        self.store(key, result)
+        return result
+
+    def store(self, key, result):
+        self.entries[key] = result
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+def window(current_round, cell):
+    """ Return the encoded 5x5 window of current_round centred on cell. A board side may be None for no bounds."""
+    board = current_round.board
+    unknown = current_round.is_unknown
+    flag_counts = current_round.flag_counts
+    row, col = cell
+    top, bottom = (0, board.rows) if board.rows is not None else (row - 2, row + 3)
+    first, last = (0, board.cols) if board.cols is not None else (col - 2, col + 3)
+    first = max(col - 2, first)
+    last = min(col + 3, last)
+    left = "." * (first - col + 2)
+    right = "." * (col + 3 - last)
+    key = []
+    for r in range(row - 2, row + 3):
+        if not top <= r < bottom:
+            key.append(".....")
+            continue
+        inner_row = row - 1 <= r <= row + 1
+        key.append(left)
+        for c in range(first, last):
+            neighbor = (r, c)
+            if unknown(neighbor):
+                key.append("?")
+            elif inner_row and col - 1 <= c <= col + 1 and not board.get_square(r, c).flagged:
+                key.append(str(board.get_square(r, c).mine_neighbors() - flag_counts.get(neighbor, 0)))
+            else:
+                key.append(".")
+        key.append(right)
+    return "".join(key)
+
+
+def relevant(key):
+    """ Return key with the unknown squares that touch none of its numbers written as '.'."""
+    numbers = {i for i in INNER if key[i] in DIGITS}
+    symbols = list(key)
+    for i, symbol in enumerate(symbols):
+        if symbol == "?" and i != CENTRE and NEAR_INNER[i].isdisjoint(numbers):
+            symbols[i] = "."
+    return "".join(symbols)
+
+
+def canonical(key):
+    return min("".join(key[i] for i in permutation) for permutation in SYMMETRIES)
+
+
+def solve_window(key):
+    """
+        Counts the layouts of the window's unknown squares that satisfy its inner numbers and
+        returns (mine, probability) for the centre. Numbers outside the window are ignored,
+        so a proof here holds on the whole board.
+    """
+    constraints = []
+    for i in INNER:
+        symbol = key[i]
+        if not symbol.isdigit():
+            continue
+        r, c = divmod(i, SIZE)
+        squares = tuple(nr * SIZE + nc
+                        for nr in range(r - 1, r + 2) for nc in range(c - 1, c + 2)
+                        if key[nr * SIZE + nc] == "?")
+        if squares:
+            constraints.append((squares, int(symbol)))
+    for component in split_components(constraints):
+        if any(CENTRE in squares for squares, _ in component):
+            dist, square_dists = count_component(component)
+            total = sum(dist)
+            mines = sum(square_dists[CENTRE])
+            if total == 0:
+                return None, 0.5
+            if mines == 0 or mines == total:
+                return mines == total, mines / total
+            return None, mines / total
+    return None, 0.5
+
+
+
+def line_windows():
+    """
+        Yields every window in which the unknown squares form one straight run through the
+        centre, numbers sit on the inner squares either side of the run, and everything else
+        is revealed or off the board. These are the edge patterns such as 1-1 and 1-2-1.
+        A number only takes values up to the number of run squares it touches.
+    """
+    for start in range(3):
+        for stop in range(3, SIZE + 1):
+            choices = []
+            for position in LINE_NUMBERS:
+                touching = len(set(range(start, stop)) & {position % SIZE - 1, position % SIZE, position % SIZE + 1})
+                choices.append("." + "0123"[:touching + 1] if touching else ".")
+            for digits in itertools.product(*choices):
+                key = ["."] * (SIZE * SIZE)
+                for c in range(start, stop):
+                    key[2 * SIZE + c] = "?"
+                for position, symbol in zip(LINE_NUMBERS, digits):
+                    key[position] = symbol
+                yield "".join(key)
+
+
+def build_table():
+    """
+        Solves every line window and returns {key: mine} for the ones whose centre is proven,
+        with each key stored in all 8 orientations so a window can be looked up as it is.
+    """
+    table = {}
+    for key in set(canonical(key) for key in line_windows()):
+        mine, _ = solve_window(key)
+        if mine is not None:
+            for permutation in SYMMETRIES:
+                table["".join(key[i] for i in permutation)] = mine
+    return table
+
+
+def save_table(table, path=TABLE_PATH):
+    with open(path, "w") as f:
+        json.dump({"size": SIZE,
+                   "mines": sorted(key for key, mine in table.items() if mine),
+                   "safe": sorted(key for key, mine in table.items() if not mine)}, f)
+
+
+def load_table(path=TABLE_PATH):
+    """
+        Loads the pattern table from path, building and saving it first if the file is missing.
+    """
+    if not os.path.exists(path):
+        save_table(build_table(), path)
+    with open(path) as f:
+        data = json.load(f)
+    if data["size"] != SIZE:
+        raise ValueError('Pattern table was built for a different window size.')
+    table = dict.fromkeys(data["safe"], False)
+    table.update(dict.fromkeys(data["mines"], True))
+    return table
+
+
+def wall_table():
+    """ Return the pattern table, loading it on first use in this process."""
+    global TABLE
+    if TABLE is None:
+        TABLE = load_table()
+    return TABLE
+
+
+if __name__ == "__main__":
+    save_table(build_table())
@@ -0,0 +1,240 @@
+"""
+    Exact mine probabilities for the frontier of a Minesweeper round.
+
+    Every revealed number gives a constraint: exactly m of these unknown squares are mines.
+    Constraints that share squares form a component; components are counted independently
+    and then combined, weighting each total by how many ways the remaining mines fit into
+    the unknown squares that no number touches.
+"""
+
+
+class MineProbabilities:
+    """
+        Computes exact per-square mine probabilities from frontier constraints.
+        Counted components are cached by their constraints, so a component that did not
+        change since the previous move is not counted again.
+    """
+
+    def __init__(self):
+        self.cache = {}
+
+    def solve(self, constraints, unconstrained, mines_left):
+        """
+            constraints is a list of (squares, mines) pairs, squares being the unknown squares
+            around a revealed number and mines how many of them are still unflagged mines.
+            unconstrained is the number of unknown squares next to no number.
+
+            Returns (probabilities, unconstrained_probability, certain), where probabilities maps
+            each constrained square to its chance of being a mine and certain maps the squares
+            that are a mine (True) or safe (False) in every consistent layout. Certainty is
+            decided on the exact integer counts, since a float can round to exactly 0 or 1.
+        """
+        components = split_components(constraints)
+        cache = {}
+        counted = []
+        for component in components:
+            key = frozenset((frozenset(squares), mines) for squares, mines in component)
+            if key not in cache:
+                cache[key] = self.cache[key] if key in self.cache else count_component(component)
+            counted.append(cache[key])
+        self.cache = cache
+
+        totals = [1]
+        prefix = []
+        for dist, _ in counted:
+            prefix.append(totals)
+            totals = convolve(totals, dist)
+        suffix = [1]
+        others = [None] * len(counted)
+        for i in range(len(counted) - 1, -1, -1):
+            others[i] = convolve(prefix[i], suffix)
+            suffix = convolve(suffix, counted[i][0])
+
+        fill = remaining_weights(unconstrained, mines_left, len(totals) - 1)
+        weight = sum(ways * fill[t] for t, ways in enumerate(totals))
+        if weight == 0:
+            raise ValueError('No mine layout is consistent with the board.')
+
+        probabilities = {}
+        certain = {}
+        for (dist, square_dists), rest in zip(counted, others):
+            k_weights = []
+            for k in range(len(dist)):
+                k_weights.append(sum(ways * fill[k + t] for t, ways in enumerate(rest)))
+            for square, square_dist in square_dists.items():
+                mine_weight = sum(ways * k_weights[k] for k, ways in enumerate(square_dist))
+                probabilities[square] = mine_weight / weight
+                if mine_weight == 0 or mine_weight == weight:
+                    certain[square] = mine_weight == weight
+
+        unconstrained_probability = 0
+        if unconstrained:
+            unconstrained_probability = sum(ways * fill[t] * (mines_left - t)
+                                            for t, ways in enumerate(totals)) / (weight * unconstrained)
+        return probabilities, unconstrained_probability, certain
+
+
+def remaining_weights(unconstrained, mines_left, most):
+    """
+        Returns weights[t] for t in 0..most, proportional to C(unconstrained, mines_left - t):
+        the ways to place the mines the frontier leaves over in the unconstrained squares.
+
+        Every binomial in the range is divided by the smallest one and multiplied by high!/low!,
+        which keeps the weights exact integers. Each is a product of at most most factors no
+        larger than unconstrained, so its size grows with the frontier rather than with the
+        board, even when a huge board makes the binomials themselves millions of digits long.
+    """
+    weights = [0] * (most + 1)
+    low = max(0, mines_left - most)
+    high = min(unconstrained, mines_left)
+    if low > high:
+        return weights
+    falling = [1]
+    for left in range(low, high):
+        falling.append(falling[-1] * (unconstrained - left))
+    rising = 1
+    for left in range(high, low - 1, -1):
+        weights[mines_left - left] = falling[left - low] * rising
+        rising *= left
+    return weights
+
+
+def split_components(constraints):
+    """
+        Groups constraints that share squares, using union-find over the squares.
+    """
+    parent = {}
+
+    def find(square):
+        while parent[square] != square:
+            parent[square] = parent[parent[square]]
+            square = parent[square]
+        return square
+
+    for squares, _ in constraints:
+        for square in squares:
+            parent.setdefault(square, square)
+        root = find(squares[0])
+        for square in squares[1:]:
+            other = find(square)
+            if other != root:
+                parent[other] = root
+
+    components = {}
+    for squares, mines in constraints:
+        components.setdefault(find(squares[0]), []).append((squares, mines))
+    return list(components.values())
+
+
+def order_squares(constraints):
+    """
+        Orders the squares of a component breadth-first through shared constraints,
+        which keeps few constraints open at any point of the count.
+    """
+    by_square = {}
+    for j, (squares, _) in enumerate(constraints):
+        for square in squares:
+            by_square.setdefault(square, []).append(j)
+    start = min(by_square)
+    order = [start]
+    seen = {start}
+    for square in order:
+        for j in by_square[square]:
+            for other in sorted(constraints[j][0]):
+                if other not in seen:
+                    seen.add(other)
+                    order.append(other)
+    return order
+
+
+def count_component(constraints):
+    """
+        Counts the mine layouts of one component that satisfy all of its constraints.
+
+        Squares are decided one at a time; the state after each step is the number of mines
+        still owed by every constraint that has been started but not finished, and layouts
+        reaching the same state are merged (memoized) rather than enumerated separately.
+
+        Returns (dist, square_dists): dist[k] is the number of layouts with k mines and
+        square_dists[square][k] the number of those in which square is a mine.
+    """
+    squares = order_squares(constraints)
+    index = {square: i for i, square in enumerate(squares)}
+    n = len(squares)
+    members = [sorted(index[square] for square in cells) for cells, _ in constraints]
+    first = [m[0] for m in members]
+    last = [m[-1] for m in members]
+    touching = [[] for _ in range(n)]
+    for j, m in enumerate(members):
+        for position, i in enumerate(m):
+            touching[i].append((j, len(m) - position - 1))
+    active = [[j for j in range(len(constraints)) if first[j] < i <= last[j]] for i in range(n + 1)]
+
+    def step(i, state, mine):
+        owed = dict(zip(active[i], state))
+        for j, still_open in touching[i]:
+            left = (constraints[j][1] if first[j] == i else owed[j]) - mine
+            if left < 0 or left > still_open:
+                return None
+            owed[j] = left
+        return tuple(owed[j] for j in active[i + 1])
+
+    forward = [{(): [1]}]
+    edges = []
+    for i in range(n):
+        layer = {}
+        moves = {}
+        for state, dist in forward[i].items():
+            moves[state] = []
+            for mine in (0, 1):
+                following = step(i, state, mine)
+                if following is None:
+                    continue
+                moves[state].append((mine, following))
+                layer[following] = add(layer.get(following, []), shift(dist, mine))
+        forward.append(layer)
+        edges.append(moves)
+
+    backward = [None] * n + [{(): [1]}]
+    for i in range(n - 1, -1, -1):
+        layer = {}
+        for state, moves in edges[i].items():
+            dist = []
+            for mine, following in moves:
+                if following in backward[i + 1]:
+                    dist = add(dist, shift(backward[i + 1][following], mine))
+            if dist:
+                layer[state] = dist
+        backward[i] = layer
+
+    square_dists = {}
+    for i, square in enumerate(squares):
+        dist = []
+        for state, moves in edges[i].items():
+            for mine, following in moves:
+                if mine and following in backward[i + 1]:
+                    dist = add(dist, shift(convolve(forward[i][state], backward[i + 1][following]), 1))
+        square_dists[square] = dist
+    return backward[0].get((), [0]), square_dists
+
+
+def convolve(a, b):
+    result = [0] * (len(a) + len(b) - 1) if a and b else []
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+def shift(dist, by):
+    return [0] * by + dist
+
+
+def add(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+    result = list(a)
+    for i, x in enumerate(b):
+        result[i] += x
+    return result
@@ -0,0 +1,111 @@
+import sys
+import csv
+import json
+import math
+import time
+from collections import namedtuple
+
+"""
+    Per-game result records for solver runs, sinks that stream them to disk as they arrive,
+    and confidence intervals for the win rates they add up to.
+"""
+
+# Normal quantile for the two-sided 95% intervals used by default.
+Z95 = 1.959963984540054
+
+GameRecord = namedtuple("GameRecord", ["seed", "rows", "cols", "mines", "result", "moves", "guesses", "elapsed"])
+
+
+class JsonlSink:
+    """
+        Writes one JSON object per game, one per line.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps(record._asdict()) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class CsvSink:
+    """
+        Writes one CSV row per game, with a header line when the file is new.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+        if self.file.tell() == 0:
+            self.writer.writerow(GameRecord._fields)
+
+    def write(self, records):
+        self.writer.writerows(records)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def open_sink(path):
+    """ Return a CsvSink for .csv paths and a JsonlSink for anything else."""
+    if path.endswith(".csv"):
+        return CsvSink(path)
+    return JsonlSink(path)
+
+
+class Progress:
+    """
+        Prints a progress line with throughput at most once every interval seconds.
+        done is the number of games already played before this run, e.g. when resuming.
+    """
+
+    def __init__(self, total, interval=10, out=sys.stderr, done=0):
+        self.total = total
+        self.done = done
+        self.interval = interval
+        self.out = out
+        self.start = time.time()
+        self.last = self.start
+        self.shown = None
+
+    def update(self, games, wins, force=False):
+        now = time.time()
+        if games == self.shown or (not force and now - self.last < self.interval):
+            return
+        self.last = now
+        self.shown = games
+        elapsed = max(now - self.start, 1e-9)
+        print("%d/%d games, %d won (%.1f%%), %.1f games/sec" % (
+            games, self.total, wins, 100 * wins / max(games, 1), (games - self.done) / elapsed), file=self.out)
+
+
+def wilson_interval(wins, games, z=Z95):
+    """ Return the (low, high) Wilson score interval for a win rate of wins out of games."""
+    if not games:
+        return 0.0, 1.0
+    rate = wins / games
+    denominator = 1 + z * z / games
+    centre = (rate + z * z / (2 * games)) / denominator
+    half = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def paired_interval(only_first, only_second, games, z=Z95):
+    """
+        Return (difference, low, high) for the win rate of a first strategy minus a second one
+        played on the same games, where only_first counts the games only the first won and
+        only_second those only the second won. Games both won or both lost do not move the
+        difference, which is why pairing needs far fewer games than comparing separate runs.
+    """
+    if not games:
+        return 0.0, -1.0, 1.0
+    difference = (only_first - only_second) / games
+    variance = ((only_first + only_second) / games - difference * difference) / games
+    half = z * math.sqrt(max(variance, 0.0))
+    return difference, difference - half, difference + half
@@ -0,0 +1,225 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+from gameplay import Board, GameState
+from msweep import apply_move
+
+"""
+    Asyncio server hosting many games of Minesweeper at once, one per connection, and a load
+    generator that drives simulated players against it.
+
+    python3 server.py serve --port 8765          (or --unix /tmp/msweep.sock)
+    python3 server.py load --port 8765 --players 1000
+
+    The protocol is one command per line, answered by one line:
+        <row>, <column>             click; answers "<STATE> r,c r,c ..." with the revealed squares
+        f <row>, <column>           flag or unflag while the game is on; answers "<STATE>"
+        new <rows>, <cols>, <mines> start a new game; answers "<STATE>"
+        show                        answers the board, rows separated by "|"
+        quit                        closes the session
+    Anything else is answered with "ERR <reason>".
+"""
+
+LINE_LIMIT = 256
+
+
+class Session:
+    """
+        One player's game. last_active is when the player last sent a command.
+    """
+
+    def __init__(self, writer, board):
+        self.writer = writer
+        self.board = board
+        self.last_active = time.monotonic()
+
+
+class GameServer:
+    """
+        Hosts one Board per connection.
+
+        Sessions idle for more than idle_timeout seconds are closed by a reaper task, at most
+        max_sessions are open at once, and no session may hold a board of more than max_cells
+        squares, which caps the memory a single player can take. Players cannot undo, so each
+        move's undo entry is dropped once it is played, and flags are refused once a game is over.
+        Boards of the shapes players ask for share gameplay's topology cache, which keeps only
+        the last few shapes.
+    """
+
+    def __init__(self, rows=10, cols=10, mines=10, idle_timeout=300, max_sessions=10000, max_cells=10000):
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_cells = max_cells
+        self.sessions = set()
+        self.evicted = 0
+
+    async def start(self, host="127.0.0.1", port=8765, path=None):
+        """ Starts listening on a TCP port, or on a Unix socket if path is given."""
+        if path:
+            self.server = await asyncio.start_unix_server(self.handle, path, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        self.reaper = asyncio.create_task(self.reap())
+        return self.server
+
+    async def stop(self):
+        self.reaper.cancel()
+        self.server.close()
+        for session in list(self.sessions):
+            session.writer.close()
+        await self.server.wait_closed()
+
+    async def reap(self):
+        """ Closes idle sessions, checking a few times per idle_timeout."""
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 0.01))
+            cutoff = time.monotonic() - self.idle_timeout
+            for session in [s for s in self.sessions if s.last_active < cutoff]:
+                self.evicted += 1
+                session.writer.close()
+
+    async def handle(self, reader, writer):
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(b"ERR server full\n")
+            writer.close()
+            return
+        session = Session(writer, Board(self.rows, self.cols, self.mines))
+        self.sessions.add(session)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(b"ERR line too long\n")
+                    break
+                if not line:
+                    break
+                session.last_active = time.monotonic()
+                command = line.decode(errors="replace").strip()
+                if command == "quit":
+                    break
+                writer.write((self.answer(session, command) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    def answer(self, session, command):
+        """ Runs one command on the session's board and returns the reply line."""
+        board = session.board
+        try:
+            if command == "show":
+                return "|".join("".join(board.print_square(square).strip() for square in row)
+                                for row in board.squares)
+            if command.startswith("new"):
+                rows, cols, mines = map(int, command[3:].split(","))
+                if rows <= 0 or cols <= 0 or not 0 <= mines <= rows * cols:
+                    raise ValueError
+                if rows * cols > self.max_cells:
+                    return "ERR board larger than %d squares" % self.max_cells
+                session.board = Board(rows, cols, mines)
+                return session.board.game_state.name
+            if command.startswith("f") and board.game_state in (GameState.WIN, GameState.LOSE):
+                return "ERR game over"
+            revealed = apply_move(board, command)
+            board.undo_stack.clear()
+            return " ".join([board.game_state.name] + ["%d,%d" % cell for cell in revealed])
+        except (IndexError, ValueError):
+            return "ERR invalid command"
+
+
+async def serve(args):
+    server = GameServer(args.rows, args.cols, args.mines, args.idle_timeout, args.max_sessions, args.max_cells)
+    await server.start(args.host, args.port, args.unix)
+    print("Serving Minesweeper on %s" % (args.unix or "%s:%d" % (args.host, args.port)), file=sys.stderr)
+    await asyncio.Event().wait()
+
+
+async def player(connect, rows, cols, commands, latencies, rng):
+    """
+        One simulated player: clicks random unrevealed squares, starting a new game whenever
+        one ends, and records the latency of every command in seconds.
+    """
+    reader, writer = await connect()
+    try:
+        hidden = set()
+        for _ in range(commands):
+            if not hidden:
+                command = "new %d, %d, %d" % (rows, cols, max(1, rows * cols // 8))
+                hidden = {(r, c) for r in range(rows) for c in range(cols)}
+            else:
+                command = "%d, %d" % rng.choice(sorted(hidden))
+            t0 = time.perf_counter()
+            writer.write((command + "\n").encode())
+            reply = (await reader.readline()).decode().split()
+            latencies.append(time.perf_counter() - t0)
+            if not reply or reply[0] == "ERR":
+                break
+            for cell in reply[1:]:
+                hidden.discard(tuple(map(int, cell.split(","))))
+            if reply[0] in (GameState.WIN.name, GameState.LOSE.name):
+                hidden = set()
+        writer.write(b"quit\n")
+    finally:
+        writer.close()
+
+
+async def load(args):
+    """
+        Runs args.players simulated players at once, each sending args.commands commands, and
+        prints the command latency percentiles and throughput.
+    """
+    if args.unix:
+        connect = lambda: asyncio.open_unix_connection(args.unix)
+    else:
+        connect = lambda: asyncio.open_connection(args.host, args.port)
+    rng = random.Random(args.seed)
+    latencies = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*[player(connect, args.rows, args.cols, args.commands, latencies, random.Random(rng.random()))
+                           for _ in range(args.players)])
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print("%d players, %d commands in %.2fs, %.0f commands/sec" % (
+        args.players, len(latencies), elapsed, len(latencies) / elapsed))
+    print("latency ms: mean %.3f  p50 %.3f  p90 %.3f  p99 %.3f  max %.3f" % (
+        statistics.mean(latencies) * 1000, percentile(0.5), percentile(0.9), percentile(0.99), latencies[-1] * 1000))
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Minesweeper to many players, or load test a server.")
+    parser.add_argument("mode", choices=["serve", "load"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="use this Unix socket path instead of TCP")
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--mines", type=int, default=10)
+    parser.add_argument("--idle-timeout", type=float, default=300)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--max-cells", type=int, default=10000)
+    parser.add_argument("--players", type=int, default=1000)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args) if args.mode == "serve" else load(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os
+import sys
+import time
+import argparse
+import itertools
+from collections import namedtuple
+from multiprocessing import Pool
+
+from gameplay import GameState
+from msweep import Round, Solver
+from patterns import wall_table
+
+"""
+    Measures the solver's win rate and speed over a grid of board configurations.
+
+    python3 sweep.py 9x9x10 16x16x40 16x30x99 --games 2000
+    python3 sweep.py --rows 8 16 32 --cols 8 16 32 --density 0.12 0.16 0.2 --games 500
+
+    Every configuration is cut into chunks of games, and all chunks of all configurations share
+    one process pool. Chunks are handed out most expensive first, estimating the cost of a game
+    as board area x mine density, so the largest boards start early and the small ones fill in
+    the gaps at the end instead of one worker finishing a huge chunk alone.
+"""
+
+Config = namedtuple("Config", ["rows", "cols", "mines"])
+SweepRow = namedtuple("SweepRow", ["config", "games", "wins", "seconds"])
+
+
+def parse_config(text):
+    """ Return the Config written as ROWSxCOLSxMINES."""
+    try:
+        rows, cols, mines = map(int, text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected ROWSxCOLSxMINES, got %r.' % text)
+    if rows <= 0 or cols <= 0 or not 0 <= mines < rows * cols:
+        raise argparse.ArgumentTypeError('No room for %d mines on a %dx%d board.' % (mines, rows, cols))
+    return Config(rows, cols, mines)
+
+
+def grid(rows, cols, densities):
+    """ Return a Config for every combination of rows, cols and mine density."""
+    configs = []
+    for r, c, density in itertools.product(rows, cols, densities):
+        mines = min(round(r * c * density), r * c - 1)
+        configs.append(Config(r, c, mines))
+    return configs
+
+
+def cost(config):
+    """ Estimated relative cost of one game: board area times mine density, which is the mine count."""
+    return config.mines
+
+
+def tasks(configs, games, chunk_size, seed=0, strategy="best"):
+    """
+        Splits every configuration into chunks of at most chunk_size games and returns the
+        (index, solver, seeds) tasks, most expensive first.
+    """
+    work = []
+    for index, config in enumerate(configs):
+        solver = Solver(max_games=games, chunk_size=chunk_size, seed=seed, strategy=strategy,
+                        rows=config.rows, cols=config.cols, mines=config.mines)
+        for seeds in solver.seed_chunks():
+            work.append((index, solver, seeds))
+    work.sort(key=lambda task: cost(configs[task[0]]) * len(task[2]), reverse=True)
+    return work
+
+
+def play_task(task):
+    index, solver, seeds = task
+    return index, solver.play_chunk(seeds)
+
+
+def sweep(configs, games=1000, workers=None, chunk_size=50, seed=0, strategy="best"):
+    """
+        Plays games games of every configuration on a pool of workers and returns a SweepRow
+        per configuration, in the order given. seconds is the time spent playing its games,
+        summed over workers.
+    """
+    wall_table()
+    games_played = [0] * len(configs)
+    wins = [0] * len(configs)
+    seconds = [0.0] * len(configs)
+    with Pool(workers or os.cpu_count()) as pool:
+        for index, result in pool.imap_unordered(play_task, tasks(configs, games, chunk_size, seed, strategy)):
+            games_played[index] += len(result.records)
+            wins[index] += sum(1 for record in result.records if record.result == GameState.WIN.name)
+            seconds[index] += sum(record.elapsed for record in result.records)
+    return [SweepRow(config, games_played[i], wins[i], seconds[i]) for i, config in enumerate(configs)]
+
+
+def table(rows):
+    """ Formats SweepRows as a table of win rate and games per second of worker time."""
+    lines = ["%5s %5s %6s %8s %8s %9s %10s" % ("rows", "cols", "mines", "games", "wins", "win rate", "games/s")]
+    for row in rows:
+        lines.append("%5d %5d %6d %8d %8d %8.1f%% %10.1f" % (
+            row.config.rows, row.config.cols, row.config.mines, row.games, row.wins,
+            100 * row.wins / row.games if row.games else 0.0,
+            row.games / row.seconds if row.seconds else 0.0))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure solver win rate and speed over board configurations.")
+    parser.add_argument("configs", nargs="*", type=parse_config, metavar="ROWSxCOLSxMINES")
+    parser.add_argument("--rows", type=int, nargs="+", default=[9, 16])
+    parser.add_argument("--cols", type=int, nargs="+", default=[9, 16, 30])
+    parser.add_argument("--density", type=float, nargs="+", default=[0.12, 0.16, 0.2])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategy", choices=sorted(Round.STRATEGIES), default="best")
+    args = parser.parse_args(argv)
+
+    configs = args.configs or grid(args.rows, args.cols, args.density)
+    t0 = time.time()
+    rows = sweep(configs, args.games, args.workers, args.chunk_size, args.seed, args.strategy)
+    print(table(rows))
+    print("\n%d games in %.1fs" % (sum(row.games for row in rows), time.time() - t0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import pytest
 from gameplay import Board, GameState
+from msweep import Round, Solver
+from probability import MineProbabilities
 
 class TestClick:
     
@@ -69,7 +71,92 @@ class TestClick:
         board.click(0,0)
         assert board.game_state == GameState.LOSE
 
-    
+    def test_click_returns_revealed(self):
+        """
+        Tests if a click returns exactly the squares it revealed, without
+        hitting the recursion limit on a large empty board.
+        """
+
+        board = Board(rows=300, cols=300, number_of_mines=0)
+        revealed = board.click(0,0)
+        assert len(revealed) == 300 * 300
+        assert len(set(revealed)) == len(revealed)
+        assert board.game_state == GameState.WIN
+        assert board.click(5,5) == []
+
+    def test_seeded_mines(self):
+        """
+        Tests if the same seed always places the same mines, on non-square and dense boards too.
+        """
+
+        board = Board(rows=5, cols=20, number_of_mines=99, seed=7)
+        same = Board(rows=5, cols=20, number_of_mines=99, seed=7)
+        assert sorted(board.mines_coords) == sorted(same.mines_coords)
+        assert len(set(board.mines_coords)) == 99
+        assert board.safe_remaining == 1
+
+        other = Board(rows=5, cols=20, number_of_mines=10, seed=8)
+        assert sorted(other.mines_coords) != sorted(Board(rows=5, cols=20, number_of_mines=10, seed=7).mines_coords)
+
+    def test_neighbor_counts(self):
+        """
+        Tests if the stored neighbor counts match the mines around each square,
+        including after the first click removes a mine.
+        """
+
+        board = Board(rows=10, cols=10, number_of_mines=20)
+        board.set_mines([(4,4), (4,5)])
+        board.click(4,4)
+
+        for row in range(10):
+            for col in range(10):
+                square = board.get_square(row, col)
+                mines = [n for n in board.get_neighboring_squares(square) if n.mine]
+                assert square.mine_neighbors() == len(mines)
+
+    def test_shared_topology(self):
+        """
+        Tests if boards of one shape share their neighbor tables and squares are slotted views.
+        """
+
+        board = Board(rows=4, cols=6, number_of_mines=5, seed=2)
+        assert board.topology is Board(rows=4, cols=6, number_of_mines=0).topology
+        assert board.topology is not Board(rows=6, cols=4, number_of_mines=0).topology
+        assert sorted(board.get_neighbor_coords(0, 5)) == [(0, 4), (1, 4), (1, 5)]
+        assert len(board.get_neighbor_coords(2, 2)) == 8
+
+        square = board.get_square(1, 1)
+        assert not hasattr(square, "__dict__")
+        square.flag_square()
+        assert board.get_square(1, 1).flagged and board.flag_count == 1
+        coords = {s.get_coords() for s in board.get_neighboring_squares(square)}
+        assert coords == set(board.get_neighbor_coords(1, 1))
+        assert square == board.get_square(1, 1) and square != board.get_square(1, 2)
+        assert square != Board(rows=4, cols=6, number_of_mines=0).get_square(1, 1)
+        assert board.get_square(0, 0) in set(board.get_neighboring_squares(square))
+
+    def test_topology_cache(self):
+        """
+        Tests if large boards compute the same neighbors as the tables and the cache stays bounded.
+        """
+        import gameplay
+
+        table = gameplay.topology(40, 50)
+        computed = gameplay.topology(50, 60)
+        assert isinstance(table.neighbors, tuple) and isinstance(computed.neighbors, gameplay.Computed)
+        for row, col in [(0, 0), (0, 17), (12, 0), (49, 59), (25, 30), (49, 1)]:
+            expected = sorted((r, c) for r in range(row - 1, row + 2) for c in range(col - 1, col + 2)
+                              if 0 <= r < 50 and 0 <= c < 60 and (r, c) != (row, col))
+            assert sorted(computed.neighbor_coords[row * 60 + col]) == expected
+            assert sorted(computed.neighbors[row * 60 + col]) == [r * 60 + c for r, c in expected]
+            assert computed.coords[row * 60 + col] == (row, col)
+            if row < 40:
+                assert sorted(table.neighbor_coords[row * 50 + col]) == [(r, c) for r, c in expected if r < 40 and c < 50]
+
+        for rows in range(2, 2 + 2 * gameplay.TOPOLOGY_CACHE):
+            Board(rows=rows, cols=3, number_of_mines=0)
+        assert len(gameplay.TOPOLOGIES) == gameplay.TOPOLOGY_CACHE
+
 
 class TestFlag:
 
@@ -102,3 +189,788 @@ class TestFlag:
         square.flag_square()
         assert not square.flagged
 
+    def test_win_by_flagging(self):
+        """
+        Tests if flagging exactly the mines wins the game, and a wrong flag does not.
+        """
+
+        board = Board(rows=10, cols=10, number_of_mines=0)
+        board.set_mines([(0,0), (9,9)])
+        board.click(0,1)
+        assert board.game_state == GameState.ONGOING
+
+        board.get_square(0,0).flag_square()
+        board.get_square(0,1).flag_square()
+        board.get_square(9,9).flag_square()
+        assert board.game_state == GameState.ONGOING
+
+        board.get_square(0,1).flag_square()
+        assert board.game_state == GameState.WIN
+
+    def test_win_by_clicking(self):
+        """
+        Tests if revealing the last safe square wins the game.
+        """
+
+        board = Board(rows=3, cols=3, number_of_mines=0)
+        board.set_mines([(0,0), (2,2)])
+        for row, col in [(0,1), (0,2), (1,0), (1,1), (1,2), (2,1)]:
+            board.click(row, col)
+        assert board.game_state == GameState.ONGOING
+        assert board.safe_remaining == 1
+
+        board.click(2,0)
+        assert board.game_state == GameState.WIN
+
+
+class TestPlayMoves:
+
+    def test_batch_matches_clicks(self):
+        """
+        Tests if a batch of clicks reveals what the same clicks one by one reveal, and undoes as one move.
+        """
+
+        for seed in range(10):
+            clicks = [(0,0), (4,4), (7,2), (2,7)]
+            board = Board(rows=8, cols=8, number_of_mines=6, seed=seed)
+            batched = Board(rows=8, cols=8, number_of_mines=6, seed=seed)
+            revealed = set()
+            for row, col in clicks:
+                revealed.update(board.click(row, col))
+            assert batched.play_moves(clicks=clicks) == revealed
+            assert batched.game_state == board.game_state
+            assert batched.safe_remaining == board.safe_remaining
+            batched.undo()
+            assert not any(batched.get_square(r, c).clicked for r in range(8) for c in range(8))
+            assert batched.game_state == GameState.START
+
+    def test_flags_and_chords(self):
+        """
+        Tests if a chord opens the unflagged neighbors of a satisfied number and a batch can win or lose.
+        """
+
+        board = Board(rows=3, cols=3, number_of_mines=0)
+        board.set_mines([(0,0)])
+        board.click(1,1)
+        assert board.play_moves(chords=[(1,1)]) == set()
+        assert board.play_moves(flags=[(0,0)], chords=[(1,1)]) == {(0,1), (0,2), (1,0), (1,2), (2,0), (2,1), (2,2)}
+        assert board.game_state == GameState.WIN
+        assert board.flag_count == 1
+
+        board = Board(rows=3, cols=3, number_of_mines=0)
+        board.set_mines([(0,0), (2,2)])
+        board.click(0,2)
+        assert board.play_moves(clicks=[(2,2), (2,0)]) == {(2,2)}
+        assert board.game_state == GameState.LOSE
+        assert not board.get_square(2,0).clicked
+        with pytest.raises(IndexError):
+            Board(rows=3, cols=3, number_of_mines=0).play_moves(flags=[(3,0)])
+
+
+class TestUndo:
+
+    def play_some(self, board, seed):
+        import random
+        rng = random.Random(seed)
+        for _ in range(12):
+            row, col = rng.randrange(board.rows), rng.randrange(board.cols)
+            if rng.random() < 0.3:
+                board.toggle_flag(row, col)
+            else:
+                board.click(row, col)
+
+    def state(self, board):
+        squares = [board.get_square(row, col) for row in range(board.rows) for col in range(board.cols)]
+        return ([(s.mine, s.clicked, s.flagged, s.mine_neighbors()) for s in squares], board.game_state,
+                board.safe_remaining, board.mine_count, board.flag_count, board.flagged_mines)
+
+    def test_undo_to_start(self):
+        """
+        Tests if undoing every move, including a first click on a mine, restores the new board.
+        """
+
+        for seed in range(10):
+            board = Board(rows=8, cols=8, number_of_mines=20, seed=seed)
+            start = self.state(board)
+            self.play_some(board, seed)
+            while board.undo_stack:
+                board.undo()
+            assert self.state(board) == start
+
+    def test_snapshot_restore(self):
+        """
+        Tests if restoring a snapshot brings back the board and trims the undo stack.
+        """
+
+        for seed in range(10):
+            board = Board(rows=8, cols=8, number_of_mines=20, seed=seed)
+            board.click(4,4)
+            snapshot = board.snapshot()
+            saved = self.state(board)
+            self.play_some(board, seed)
+            board.restore(snapshot)
+            assert self.state(board) == saved
+            assert len(board.undo_stack) == 1
+
+    def test_array_board(self):
+        """
+        Tests if ArrayBoard undo and bit-packed snapshots agree with Board.
+        """
+        arrayboard = pytest.importorskip("arrayboard")
+
+        for seed in range(5):
+            board = arrayboard.ArrayBoard(rows=8, cols=8, number_of_mines=20, seed=seed)
+            start = self.state(board)
+            snapshot = board.snapshot()
+            self.play_some(board, seed)
+            played = self.state(board)
+            board.restore(snapshot)
+            assert self.state(board) == start
+            self.play_some(board, seed)
+            assert self.state(board) == played
+            while board.undo_stack:
+                board.undo()
+            assert self.state(board) == start
+
+
+class TestArrayBoard:
+
+    def test_counts_match_board(self):
+        """
+        Tests if the vectorized neighbor counts agree with Square.mine_neighbors.
+        """
+        arrayboard = pytest.importorskip("arrayboard")
+
+        mines = [(0,0), (0,1), (0,2), (1,1), (5,5), (9,9)]
+        board = Board(rows=10, cols=10, number_of_mines=0)
+        board.set_mines(mines)
+        array_board = arrayboard.ArrayBoard(rows=10, cols=10, number_of_mines=0)
+        array_board.set_mines(mines)
+
+        for row in range(10):
+            for col in range(10):
+                assert array_board.get_square(row, col).mine_neighbors() == board.get_square(row, col).mine_neighbors()
+
+    def test_click_and_first_mine(self):
+        """
+        Tests flood fill, first-click mine removal and losing on an ArrayBoard.
+        """
+        arrayboard = pytest.importorskip("arrayboard")
+
+        board = arrayboard.ArrayBoard(rows=10, cols=10, number_of_mines=0)
+        board.set_mines([(0,0), (0,1), (0,2), (1,1)])
+
+        board.click(0,1)
+        assert board.get_square(0,1).clicked
+        assert not board.get_square(0,1).mine
+        assert board.get_square(0,1).mine_neighbors() == 3
+        assert board.game_state == GameState.ONGOING
+
+        board.click(9,9)
+        assert board.get_square(5,5).clicked
+        assert not board.get_square(1,1).clicked
+
+        board.click(0,0)
+        assert board.game_state == GameState.LOSE
+
+    def test_reveal_matches_board(self):
+        """
+        Tests if ArrayBoard clicks reveal the same squares as Board clicks on the same layouts.
+        """
+        arrayboard = pytest.importorskip("arrayboard")
+
+        for seed in range(10):
+            array_board = arrayboard.ArrayBoard(rows=12, cols=17, number_of_mines=30, seed=seed)
+            board = Board(rows=12, cols=17, number_of_mines=30, seed=seed)
+            for row, col in [(0,0), (11,16), (6,8), (0,16), (11,0)]:
+                assert sorted(array_board.click(row, col)) == sorted(board.click(row, col))
+                assert array_board.safe_remaining == board.safe_remaining
+                assert array_board.game_state == board.game_state
+
+    def test_first_click_on_lone_mine(self):
+        """
+        Tests if removing a mine with no mine neighbors keeps its count at zero without overflowing.
+        """
+        arrayboard = pytest.importorskip("arrayboard")
+        import warnings
+
+        board = arrayboard.ArrayBoard(rows=5, cols=5, number_of_mines=0)
+        board.set_mines([(2,2)])
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            board.click(2,2)
+        assert board.get_square(2,2).mine_neighbors() == 0
+        assert board.game_state == GameState.WIN
+
+
+class TestChunkBoard:
+
+    def test_chunks_regenerate(self):
+        """
+        Tests if evicted chunks come back with the same mines and counts match the mines.
+        """
+        from chunkboard import ChunkBoard
+
+        board = ChunkBoard(rows=100, cols=70, density=0.2, seed=5, chunk_size=16)
+        evicting = ChunkBoard(rows=100, cols=70, density=0.2, seed=5, chunk_size=16, max_clean_chunks=1)
+        mines = {(r, c) for r in range(100) for c in range(70) if board.is_mine(r, c)}
+        assert len(mines) == board.mine_count
+        assert mines == {(r, c) for r in range(100) for c in range(70) if evicting.is_mine(r, c)}
+        assert len(evicting.clean) == 1 and not evicting.dirty
+        for r, c in [(0, 0), (15, 15), (16, 16), (99, 69), (50, 31)]:
+            expected = sum(neighbor in mines for neighbor in board.get_neighbor_coords(r, c))
+            assert evicting.get_square(r, c).mine_neighbors() == expected
+
+    def test_first_click_and_win(self):
+        """
+        Tests first-click mine removal and that only chunks with clicked squares are kept.
+        """
+        from chunkboard import ChunkBoard
+
+        board = ChunkBoard(rows=10, cols=10, density=0.04, seed=1, chunk_size=5)
+        mines = [(r, c) for r in range(10) for c in range(10) if board.is_mine(r, c)]
+        assert len(mines) == board.mine_count == 4
+        revealed = board.click(*mines[0])
+        assert board.mine_count == 3 and not board.is_mine(*mines[0])
+        assert board.game_state == GameState.ONGOING
+        for r, c in revealed:
+            assert board.get_square(r, c).mine_neighbors() == sum(
+                neighbor in mines[1:] for neighbor in board.get_neighbor_coords(r, c))
+        assert {(r // 5, c // 5) for r, c in revealed} == set(board.dirty)
+
+    def test_unopened_bounds(self):
+        """
+        Tests if the unopened set keeps its bounds as squares are removed and samples near them.
+        """
+        from chunkboard import ChunkBoard
+
+        unopened = ChunkBoard(seed=1, chunk_size=4).unopened()
+        for cell in [(5, 5), (-3, 9), (7, -2), (0, 0)]:
+            unopened.discard(cell)
+        assert unopened.bounds == [-3, 7, -2, 9]
+        samples = [cell for cell, _ in zip(unopened, range(200))]
+        assert all(-7 <= r <= 11 and -6 <= c <= 13 and cell not in unopened.removed for cell in samples for r, c in [cell])
+
+    def test_solve_huge_board(self):
+        """
+        Tests if a round plays on a board too large to list, holding only the explored chunks.
+        """
+        from chunkboard import ChunkBoard
+
+        for rows in (100000, None):
+            board = ChunkBoard(rows=rows, cols=rows, density=0.15, seed=0)
+            current_round = Round(board, "exact")
+            for _ in range(100):
+                guess = current_round.choose()
+                if board.game_state not in [GameState.ONGOING, GameState.START]:
+                    break
+                current_round.reveal(board.click(*guess))
+            assert board.game_state != GameState.START
+            assert len(board.dirty) + len(board.clean) < 100
+
+
+class TestBatchSimulator:
+
+    def test_batch_play(self):
+        """
+        Tests if every game in a batch finishes and deductions only ever flag mines.
+        """
+        batchsim = pytest.importorskip("batchsim")
+
+        simulator = batchsim.BatchSimulator(200, 9, 9, 10, seed=3)
+        states = simulator.run()
+        assert set(states.tolist()) <= {GameState.WIN.value, GameState.LOSE.value}
+        assert not (simulator.flagged & ~simulator.mines).any()
+        assert (simulator.moves >= 1).all()
+
+    def test_simulate_counts(self):
+        """
+        Tests if batched simulation plays the requested number of games and wins mine-free boards.
+        """
+        batchsim = pytest.importorskip("batchsim")
+
+        assert batchsim.simulate(25, 5, 5, 0, seed=1, batch_size=10) == (25, 25)
+        wins, games = batchsim.simulate(25, 9, 9, 10, seed=1, batch_size=10)
+        assert games == 25 and 0 <= wins <= 25
+
+
+class TestRound:
+
+    def test_frontier_updates(self):
+        """
+        Tests if the frontier holds exactly the unknown squares next to revealed numbers.
+        """
+
+        board = Board(rows=4, cols=6, number_of_mines=0)
+        board.set_mines([(0,0), (3,5)])
+        current_round = Round(board)
+        current_round.reveal(board.click(0,3))
+
+        assert current_round.frontier == {(0,0), (3,5)}
+        assert not current_round.interior
+        assert current_round.unknown_counts[(1,1)] == 1
+
+    def test_play_other_sizes(self):
+        """
+        Tests if a round plays a full game on a board that is not 10x10,
+        only ever flagging squares that hold mines.
+        """
+
+        for seed in range(5):
+            board = Board(rows=16, cols=30, number_of_mines=99, seed=seed)
+            assert Round(board).play() in [GameState.WIN, GameState.LOSE]
+            assert board.flag_count == board.flagged_mines
+
+
+    def test_no_move_after_flag_win(self):
+        """
+        Tests if a game won by flagging its last mine records no click after the win.
+        """
+
+        for strategy in ["best", "exact"]:
+            for seed in range(20):
+                board = Board(rows=10, cols=10, seed=seed)
+                current_round = Round(board, strategy=strategy)
+                current_round.play()
+                clicks = [move for move in current_round.history if not move[2]]
+                assert current_round.moves == len(clicks)
+                assert all(board.get_square(row, col).clicked for row, col, _ in clicks)
+
+
+    def test_pattern_cache(self):
+        """
+        Tests if window deductions are shared across rotations and the cache stays within its size.
+        """
+        import patterns
+
+        board = Board(rows=5, cols=5, number_of_mines=0)
+        board.set_mines([(0,0), (0,4)])
+        current_round = Round(board)
+        current_round.reveal(board.click(4,2))
+
+        cache = patterns.PatternCache(size=3)
+        assert cache.deduce(current_round, (0,0)) == cache.deduce(current_round, (0,4))
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert len(cache.entries) <= 3
+
+        # A 1 in the corner with a single unknown neighbor: that neighbor is a mine.
+        assert cache.deduce(current_round, (0,0))[0] is True
+
+    def test_one_two_one_window(self):
+        """
+        Tests if the window deduction finds the safe square over the 2 of a 1-2-1, and a mine
+        forced by a 2 with two unknown neighbors.
+        """
+        import patterns
+
+        key = "....." + "....." + "?????" + ".121." + "....."
+        assert patterns.solve_window(key) == (False, 0)
+        assert patterns.solve_window(patterns.canonical(key)) == (False, 0)
+        pair = "....." + "....." + ".??.." + ".2..." + "....."
+        assert patterns.solve_window(pair) == (True, 1)
+
+
+    def test_pattern_table(self, tmp_path):
+        """
+        Tests if the pattern table is built and saved when missing, and holds every orientation
+        of a 1-2-1 against a wall.
+        """
+        import os
+        import patterns
+
+        path = str(tmp_path / "table.json")
+        table = patterns.load_table(path)
+        assert os.path.exists(path)
+        assert patterns.load_table(path) == table
+
+        key = "....." + "....." + "?????" + ".121." + "....."
+        for permutation in patterns.SYMMETRIES:
+            assert table["".join(key[i] for i in permutation)] is False
+        assert table["....." + "....." + ".??.." + ".2..." + "....."] is True
+
+
+class TestTournament:
+
+    def test_random_strategy(self):
+        """
+        Tests if the random strategy plays to the end and repeats on the same seed.
+        """
+
+        histories = []
+        for _ in range(2):
+            current_round = Round(Board(rows=6, cols=6, number_of_mines=5, seed=3), "random", first_click=(2,2))
+            assert current_round.play() in [GameState.WIN, GameState.LOSE]
+            assert current_round.history[0] == (2, 2, 0)
+            assert current_round.guesses > 0
+            histories.append(current_round.history)
+        assert histories[0] == histories[1]
+
+        from chunkboard import ChunkBoard
+        current_round = Round(ChunkBoard(rows=40, cols=40, density=0.1, seed=4, chunk_size=8), "random")
+        assert current_round.play() in [GameState.WIN, GameState.LOSE]
+        assert current_round.guesses > 0
+
+    def test_intervals(self):
+        """
+        Tests the Wilson and paired intervals against hand-computed values.
+        """
+        from results import paired_interval, wilson_interval
+
+        low, high = wilson_interval(80, 100)
+        assert round(low, 4) == 0.7112 and round(high, 4) == 0.8666
+        assert wilson_interval(0, 0) == (0.0, 1.0)
+        difference, low, high = paired_interval(10, 30, 1000)
+        assert difference == -0.02
+        assert round(high - difference, 5) == round(1.959963984540054 * ((0.04 - 0.0004) / 1000) ** 0.5, 5)
+
+    def test_tournament(self):
+        """
+        Tests if every strategy plays every seed and the pair tallies match the wins.
+        """
+        import tournament
+
+        result = tournament.tournament(["best", "random"], games=20, rows=6, cols=6, mines=5, workers=2, chunk_size=6)
+        assert result.games == 20
+        assert result.wins["best"] - result.wins["random"] == result.only["best", "random"] - result.only["random", "best"]
+        assert "best - random" in result.report()
+
+
+class TestProbabilities:
+
+    def test_one_two_one(self):
+        """
+        Tests the 1-2-1 pattern: the squares above the 1s are mines, the rest are safe.
+        """
+
+        row = [(0,0), (0,1), (0,2), (0,3), (0,4)]
+        constraints = [(tuple(row[0:3]), 1), (tuple(row[1:4]), 2), (tuple(row[2:5]), 1)]
+        probabilities, unconstrained, certain = MineProbabilities().solve(constraints, 10, 5)
+
+        assert [probabilities[square] for square in row] == [0, 1, 0, 1, 0]
+        assert [certain[square] for square in row] == [False, True, False, True, False]
+        assert unconstrained == 3 / 10
+
+    def test_weighted_by_remaining_mines(self):
+        """
+        Tests if layouts are weighted by the ways to place the other mines off the frontier.
+        """
+
+        constraints = [(((0,0), (0,1)), 1), (((0,1), (0,2)), 1)]
+        probabilities, unconstrained, certain = MineProbabilities().solve(constraints, 2, 2)
+
+        # (0,1) alone leaves 1 mine for 2 free squares: 2 ways; (0,0)+(0,2) leaves 0: 1 way.
+        assert probabilities[(0,1)] == 2 / 3
+        assert probabilities[(0,0)] == 1 / 3
+        assert unconstrained == 1 / 3
+        assert not certain
+
+    def test_certainty_is_exact(self):
+        """
+        Tests if a square whose probability rounds to 1 is not reported as a certain mine.
+        """
+
+        constraints = [(((0,0), (1,i)), 1) for i in range(8)]
+        probabilities, unconstrained, certain = MineProbabilities().solve(constraints, 1000000, 1000)
+
+        assert probabilities[(0,0)] == 1.0
+        assert (0,0) not in certain
+
+    def test_exact_strategy(self):
+        """
+        Tests if the exact strategy plays full games without flagging safe squares.
+        """
+
+        for seed in range(5):
+            board = Board(rows=16, cols=30, number_of_mines=99, seed=seed)
+            assert Round(board, strategy="exact").play() in [GameState.WIN, GameState.LOSE]
+            assert board.flag_count == board.flagged_mines
+
+
+class TestSolver:
+
+    def test_autoplay_counts(self):
+        """
+        Tests if the worker pool plays exactly max_games games.
+        """
+
+        solver = Solver(max_games=23, workers=2, chunk_size=5)
+        solver.autoplay()
+        assert solver.game_count == 23
+        assert 0 <= solver.win_count <= 23
+
+    def test_streamed_records(self, tmp_path):
+        """
+        Tests if every game is written to the records file with its result.
+        """
+        import json
+
+        path = str(tmp_path / "games.jsonl")
+        solver = Solver(max_games=12, workers=2, chunk_size=5, records=path)
+        solver.autoplay()
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        assert sorted(record["seed"] for record in records) == list(range(12))
+        assert sum(record["result"] == "WIN" for record in records) == solver.win_count
+        assert all(record["guesses"] <= record["moves"] for record in records)
+
+    def test_adaptive_stop(self, tmp_path):
+        """
+        Tests if an adaptive run stops on the interval width or time budget, on the first seeds.
+        """
+        import json
+        from results import wilson_interval
+
+        path = str(tmp_path / "games.jsonl")
+        solver = Solver(max_games=100000, workers=2, target_width=0.3, records=path)
+        solver.autoplay()
+        low, high = wilson_interval(solver.win_count, solver.game_count)
+        assert high - low <= 0.3 and solver.game_count < 1000
+        assert "target width" in solver.stop_reason
+        with open(path) as f:
+            assert sorted(json.loads(line)["seed"] for line in f) == list(range(solver.game_count))
+
+        solver = Solver(max_games=100000, workers=2, time_budget=0)
+        solver.autoplay()
+        assert solver.game_count == 25 and "time budget" in solver.stop_reason
+
+    def test_board_shape(self):
+        """
+        Tests if games are played on the board size and mine count given to the solver.
+        """
+
+        record = Solver(rows=5, cols=7, mines=3).play_round(seed=1)
+        assert (record.rows, record.cols, record.mines) == (5, 7, 3)
+
+    def test_sweep(self):
+        """
+        Tests if a sweep plays every configuration and schedules the costliest chunks first.
+        """
+        import sweep
+
+        configs = [sweep.parse_config("5x5x2"), sweep.parse_config("8x8x10")] + sweep.grid([6], [6, 7], [0.1])
+        assert configs[2:] == [sweep.Config(6, 6, 4), sweep.Config(6, 7, 4)]
+        order = [configs[index] for index, _, _ in sweep.tasks(configs, 10, 4)]
+        assert order[0] == sweep.Config(8, 8, 10) and order[-1] == sweep.Config(5, 5, 2)
+
+        rows = sweep.sweep(configs, games=10, workers=2, chunk_size=4)
+        assert [row.config for row in rows] == configs
+        assert all(row.games == 10 and 0 <= row.wins <= 10 and row.seconds > 0 for row in rows)
+        assert len(sweep.table(rows).splitlines()) == len(configs) + 1
+
+    def test_layout_file(self, tmp_path):
+        """
+        Tests if layouts regenerate from their seed and replay the same games in every run.
+        """
+        layouts = pytest.importorskip("layouts")
+        from gamefile import GameReader
+
+        path = str(tmp_path / "layouts.bin")
+        layouts.generate(path, 30, 6, 9, 12, seed=4, batch_size=7)
+        layout_file = layouts.LayoutFile(path)
+        assert (layout_file.rows, layout_file.cols, layout_file.number_of_mines, len(layout_file)) == (6, 9, 12, 30)
+        layouts.generate(str(tmp_path / "again.bin"), 30, 6, 9, 12, seed=4, batch_size=7)
+        assert (tmp_path / "again.bin").read_bytes() == (tmp_path / "layouts.bin").read_bytes()
+
+        for index in (0, 29):
+            board = layout_file.board(index)
+            fresh = Board(rows=6, cols=9, number_of_mines=0)
+            fresh.set_mines(layout_file.mines(index))
+            assert len(layout_file.mines(index)) == board.mine_count == 12
+            assert [[(s.mine, s.mine_neighbors(), s.clicked) for s in row] for row in board.squares] == \
+                   [[(s.mine, s.mine_neighbors(), s.clicked) for s in row] for row in fresh.squares]
+            board.click(0, 0)
+        with pytest.raises(IndexError):
+            layout_file.board(30)
+
+        histories = []
+        for index in (5, 6, 5):
+            current_round = Round(layout_file.board(index), "random", first_click=(0, 0))
+            current_round.play()
+            histories.append(current_round.history)
+        assert histories[0] == histories[2]
+
+        results = []
+        for run in range(2):
+            game_file = str(tmp_path / ("games%d.bin" % run))
+            solver = Solver(max_games=30, workers=2, chunk_size=7, layouts=path, game_file=game_file)
+            solver.autoplay()
+            results.append(sorted((e.seed, sorted(e.mines), e.result) for e in GameReader(game_file)))
+        assert results[0] == results[1]
+        assert [entry[1] for entry in results[0]] == [sorted(layout_file.mines(i)) for i in range(30)]
+        with pytest.raises(ValueError):
+            Solver(max_games=31, layouts=path).autoplay()
+
+
+class TestBench:
+
+    def test_run_and_compare(self):
+        """
+        Tests if the benchmark suite runs every case and flags a slowdown when comparing runs.
+        """
+        import bench
+
+        results = bench.run_benchmarks([(9, 9)], [0.1], min_time=0)
+        assert {"construct", "click", "flood_fill", "winner", "print_board"} <= {r["case"] for r in results}
+
+        slower = [dict(result, median=result["median"] * 2) for result in results]
+        assert len(bench.compare({"results": results}, {"results": slower})) == len(results)
+        assert bench.compare({"results": results}, {"results": results}) == []
+
+
+class TestInstrument:
+
+    def test_enable_and_disable(self):
+        """
+        Tests if instrumentation records clicks and moves, and leaves no wrappers behind.
+        """
+        import instrument
+
+        click = Board.click
+        stats = instrument.Stats()
+        instrument.enable(stats, Round)
+        try:
+            board = Board(rows=9, cols=9, number_of_mines=10, seed=1)
+            Round(board).play()
+        finally:
+            instrument.disable()
+
+        assert Board.click is click
+        assert stats.histograms["moves_per_game"].count == 1
+        batched = stats.histograms["clicks_per_batch"].total if "clicks_per_batch" in stats.histograms else 0
+        assert stats.histograms["click_us"].count + batched == stats.histograms["moves_per_game"].total
+        assert stats.counters["Board.get_neighbor_coords"] > 0
+
+        merged = instrument.Stats.from_dict(stats.as_dict())
+        merged.merge(stats)
+        assert merged.histograms["moves_per_game"].count == 2
+
+
+class TestGameFile:
+
+    def test_write_read_replay(self, tmp_path):
+        """
+        Tests if recorded games read back intact and replay to the same result.
+        """
+        from gamefile import GameReader
+
+        path = str(tmp_path / "games.bin")
+        solver = Solver(max_games=15, workers=2, chunk_size=4, game_file=path, strategy="exact")
+        solver.autoplay()
+
+        reader = GameReader(path)
+        assert len(reader) == 15
+        assert sorted(entry.seed for entry in reader) == list(range(15))
+        for index, entry in enumerate(reader):
+            assert sorted(entry.mines) == sorted(Board(10, 10, seed=entry.seed).mines_coords)
+            assert reader.replay(index).game_state == entry.result
+        reader.close()
+
+
+class InterruptedSolver(Solver):
+
+    def play_chunk(self, seeds):
+        if seeds.start == 10:
+            raise RuntimeError("preempted")
+        return Solver.play_chunk(self, seeds)
+
+
+class TestCheckpoint:
+
+    def test_resume(self, tmp_path):
+        """
+        Tests if an interrupted run resumes from its checkpoint without replaying or
+        double-writing finished games.
+        """
+        import json
+
+        checkpoint = str(tmp_path / "run.json")
+        records = str(tmp_path / "games.jsonl")
+        settings = dict(max_games=20, workers=1, chunk_size=5, checkpoint=checkpoint,
+                        checkpoint_interval=0, records=records)
+
+        with pytest.raises(RuntimeError):
+            InterruptedSolver(**settings).autoplay()
+        with open(checkpoint) as f:
+            assert json.load(f)["completed"] == [[0, 10]]
+
+        solver = Solver(**settings)
+        solver.autoplay()
+        assert solver.game_count == 20
+
+        with open(records) as f:
+            seeds = [json.loads(line)["seed"] for line in f]
+        assert sorted(seeds) == list(range(20))
+
+    def test_resume_before_first_interval(self, tmp_path):
+        """
+        Tests if a run interrupted before its first timed checkpoint resumes without duplicate records.
+        """
+        import json
+
+        checkpoint = str(tmp_path / "run.json")
+        records = str(tmp_path / "games.jsonl")
+        settings = dict(max_games=20, workers=1, chunk_size=5, checkpoint=checkpoint,
+                        checkpoint_interval=3600, records=records)
+
+        with pytest.raises(RuntimeError):
+            InterruptedSolver(**settings).autoplay()
+        with open(checkpoint) as f:
+            assert json.load(f)["file_sizes"] == {records: 0}
+
+        Solver(**settings).autoplay()
+        with open(records) as f:
+            seeds = [json.loads(line)["seed"] for line in f]
+        assert sorted(seeds) == list(range(20))
+
+
+class TestServer:
+
+    def test_sessions_and_load(self, tmp_path):
+        """
+        Tests the line protocol, the per-session size and memory caps, idle eviction and the load generator.
+        """
+        import asyncio
+        import argparse
+        import gameplay
+        import server
+
+        path = str(tmp_path / "msweep.sock")
+
+        async def scenario():
+            game_server = server.GameServer(rows=5, cols=5, mines=0, idle_timeout=0.2, max_cells=100)
+            await game_server.start(path=path)
+            reader, writer = await asyncio.open_unix_connection(path)
+
+            async def send(command):
+                writer.write((command + "\n").encode())
+                return (await reader.readline()).decode().strip()
+
+            assert await send("f 0, 0") == "START"
+            assert await send("9, 9") == "ERR invalid command"
+            assert await send("new 20, 20, 1") == "ERR board larger than 100 squares"
+            assert await send("new 3, 3, 0") == "START"
+            assert sorted((await send("1, 1")).split()) == sorted(
+                ["WIN"] + ["%d,%d" % (r, c) for r in range(3) for c in range(3)])
+            assert await send("show") == "...|...|..."
+            assert await send("f 0, 0") == "ERR game over"
+            assert not next(iter(game_server.sessions)).board.undo_stack
+            for rows in range(1, 3 * gameplay.TOPOLOGY_CACHE):
+                assert await send("new %d, 2, 0" % rows) == "START"
+                assert await send("f 0, 1") == "START"
+            assert len(gameplay.TOPOLOGIES) <= gameplay.TOPOLOGY_CACHE
+            assert not next(iter(game_server.sessions)).board.undo_stack
+
+            await asyncio.sleep(0.6)
+            assert await reader.readline() == b""
+            assert game_server.evicted == 1 and not game_server.sessions
+
+            args = argparse.Namespace(unix=path, host=None, port=None, rows=5, cols=5,
+                                      players=50, commands=10, seed=1)
+            latencies = await server.load(args)
+            await game_server.stop()
+            return latencies
+
+        latencies = asyncio.run(scenario())
+        assert len(latencies) == 500
+
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import argparse
+import itertools
+from multiprocessing import Pool
+
+from gameplay import Board, GameState
+from msweep import Round
+from patterns import wall_table
+from results import Z95, paired_interval, wilson_interval
+
+"""
+    Plays several solver strategies against each other on identical boards.
+
+    python3 tournament.py best exact random --games 5000 --rows 16 --cols 16 --mines 40
+
+    Every game seed is played once by every strategy, on the same mine layout and opening
+    with the same first click, in a pool of workers. Comparing the strategies game by game
+    only counts the games where they disagree, so a difference in win rate is resolved with
+    far fewer games than by comparing the win rates of separate runs.
+"""
+
+
+class Tournament:
+    """
+        Tallies of strategies played on the same seeds: wins per strategy, and for every pair
+        (a, b) the games only a won and the games only b won.
+    """
+
+    def __init__(self, strategies):
+        self.strategies = list(strategies)
+        self.games = 0
+        self.wins = dict.fromkeys(self.strategies, 0)
+        self.only = {pair: 0 for pair in itertools.permutations(self.strategies, 2)}
+
+    def add(self, won):
+        """ Adds one game, given as a tuple of whether each strategy won it."""
+        self.games += 1
+        for strategy, result in zip(self.strategies, won):
+            self.wins[strategy] += result
+        for (a, won_a), (b, won_b) in itertools.permutations(zip(self.strategies, won), 2):
+            if won_a and not won_b:
+                self.only[a, b] += 1
+
+    def report(self):
+        """ Returns the win rates and the paired differences, with 95% intervals, as text."""
+        lines = ["%-10s %8s %8s %9s %19s" % ("strategy", "games", "wins", "win rate", "95% CI")]
+        for strategy in self.strategies:
+            low, high = wilson_interval(self.wins[strategy], self.games)
+            lines.append("%-10s %8d %8d %8.1f%%   [%6.1f%%, %6.1f%%]" % (
+                strategy, self.games, self.wins[strategy], 100 * self.wins[strategy] / max(self.games, 1),
+                100 * low, 100 * high))
+        lines.append("")
+        lines.append("%-21s %8s %19s %8s %8s %10s" % ("pair", "diff", "95% CI", "a only", "b only", "unpaired"))
+        for a, b in itertools.combinations(self.strategies, 2):
+            difference, low, high = paired_interval(self.only[a, b], self.only[b, a], self.games)
+            lines.append("%-21s %7.1f%%   [%6.1f%%, %6.1f%%] %8d %8d %9.1f%%" % (
+                "%s - %s" % (a, b), 100 * difference, 100 * low, 100 * high,
+                self.only[a, b], self.only[b, a], 100 * self.unpaired_half_width(a, b)))
+        return "\n".join(lines)
+
+    def unpaired_half_width(self, a, b):
+        """ The half width the difference's interval would have from two separate runs this long."""
+        if not self.games:
+            return 1.0
+        p, q = self.wins[a] / self.games, self.wins[b] / self.games
+        return Z95 * ((p * (1 - p) + q * (1 - q)) / self.games) ** 0.5
+
+
+def play_seeds(task):
+    """
+        Plays every strategy on each seed of one chunk and returns a tuple of wins per seed.
+    """
+    strategies, rows, cols, mines, first_click, seeds = task
+    results = []
+    for seed in seeds:
+        won = []
+        for strategy in strategies:
+            board = Board(rows=rows, cols=cols, number_of_mines=mines, seed=seed)
+            won.append(Round(board, strategy, first_click=first_click).play() == GameState.WIN)
+        results.append(tuple(won))
+    return results
+
+
+def tournament(strategies, games=1000, rows=10, cols=10, mines=10, first_click=None, seed=0,
+               workers=None, chunk_size=50):
+    """
+        Plays games seeds from seed on with every strategy and returns the Tournament.
+        first_click defaults to the centre of the board.
+    """
+    first_click = first_click or (rows // 2, cols // 2)
+    wall_table()
+    result = Tournament(strategies)
+    tasks = [(result.strategies, rows, cols, mines, first_click, range(start, min(start + chunk_size, seed + games)))
+             for start in range(seed, seed + games, chunk_size)]
+    with Pool(workers or os.cpu_count()) as pool:
+        for chunk in pool.imap_unordered(play_seeds, tasks):
+            for won in chunk:
+                result.add(won)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play solver strategies against each other on identical boards.")
+    parser.add_argument("strategies", nargs="+", choices=sorted(Round.STRATEGIES))
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--mines", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    args = parser.parse_args(argv)
+    if len(set(args.strategies)) < 2:
+        parser.error("need at least two different strategies")
+
+    t0 = time.time()
+    result = tournament(list(dict.fromkeys(args.strategies)), args.games, args.rows, args.cols, args.mines,
+                        seed=args.seed, workers=args.workers, chunk_size=args.chunk_size)
+    print(result.report())
+    print("\n%d games per strategy in %.1fs" % (result.games, time.time() - t0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())